@@ -0,0 +1,307 @@
+"""
+Benchmarks for degrees of separation loading and search.
+
+    python benchmark.py load DIRECTORY
+    python benchmark.py query DIRECTORY [--queries N]
+    python benchmark.py parallel DIRECTORY [--queries N] [--processes P]
+    python benchmark.py suite [--edges 10000,100000,1000000] [--json FILE]
+
+load reports the time and peak RSS of each loader, each measured in a
+fresh interpreter. query reports latency percentiles per path length for
+each search. parallel compares Graph.search with the multi-core
+ParallelSearch. suite generates synthetic power-law datasets of the
+given sizes (see generate.py) and runs load and query on each.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from generate import generate
+from graph import SNAPSHOT_NAME, load_graph
+
+LOADERS = ("dicts", "csr", "snapshot-build", "snapshot-mmap")
+SEARCHES = ("csr", "dicts", "bidirectional")
+
+
+def sample_pairs(graph, count, seed):
+    """
+    Returns count random (source, target) person int pairs.
+    """
+    rng = random.Random(seed)
+    n = graph.num_people()
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(count)]
+
+
+def timed(function, *args):
+    """Returns (result, elapsed seconds) of function(*args)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def path_length(path):
+    """Returns the degrees of a path, or None if not connected."""
+    return None if path is None else len(path)
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a sorted list."""
+    index = max(0, min(len(values) - 1,
+                       int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def peak_rss_mb():
+    """Returns this process's peak resident set size in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(cell)) for cell in column)
+        for column in zip(header, *rows)
+    ]
+    for row in [header] + rows:
+        print("  ".join(
+            str(cell).rjust(width) for cell, width in zip(row, widths)
+        ))
+
+
+def load_once(directory, loader):
+    """
+    Runs one loader in this process and returns (seconds, peak RSS MB).
+    """
+    start = time.perf_counter()
+    if loader == "dicts":
+        import degrees
+        degrees.load_data(directory)
+    elif loader == "csr":
+        load_graph(directory)
+    elif loader == "snapshot-build":
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        if os.path.exists(path):
+            os.remove(path)
+        load_graph(directory, snapshot=True)
+    elif loader == "snapshot-mmap":
+        load_graph(directory, snapshot=True)
+    else:
+        raise ValueError(f"unknown loader {loader}")
+    return time.perf_counter() - start, peak_rss_mb()
+
+
+def run_load(directory):
+    """
+    Measures every loader in a fresh interpreter, so peak RSS is not
+    shared between them. Returns {loader: {"seconds", "peak_rss_mb"}}.
+    """
+    results = {}
+    for loader in LOADERS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__),
+             "load-once", directory, loader],
+            check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        results[loader] = json.loads(output)
+    return results
+
+
+def print_load(results):
+    print_table(["loader", "seconds", "peak RSS MB"], [
+        [loader, f"{r['seconds']:.3f}", f"{r['peak_rss_mb']:.1f}"]
+        for loader, r in results.items()
+    ])
+
+
+def run_query(directory, queries, seed, searches=SEARCHES):
+    """
+    Times each search on the same random pairs. Returns
+    {search: {degrees: {"count", "p50_ms", "p90_ms", "p99_ms", "max_ms"}}}
+    with degrees "none" for unconnected pairs.
+    """
+    graph = load_graph(directory)
+    pairs = sample_pairs(graph, queries, seed)
+    functions = {"csr": graph.search}
+    if "dicts" in searches or "bidirectional" in searches:
+        import degrees
+        degrees.load_data(directory)
+        ids = graph.person_ids
+        functions["dicts"] = lambda s, t: degrees.shortest_path(
+            ids[s], ids[t])
+        functions["bidirectional"] = (
+            lambda s, t: degrees.bidirectional_shortest_path(ids[s], ids[t])
+        )
+
+    results = {}
+    for search in searches:
+        latencies = defaultdict(list)
+        for source, target in pairs:
+            path, elapsed = timed(functions[search], source, target)
+            length = path_length(path)
+            latencies["none" if length is None else length].append(elapsed)
+        results[search] = {}
+        for length in sorted(latencies, key=lambda d: (d == "none", d)):
+            values = sorted(latencies[length])
+            results[search][length] = {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5) * 1000,
+                "p90_ms": percentile(values, 0.9) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+    return results
+
+
+def print_query(results):
+    rows = []
+    for search, by_length in results.items():
+        for length, r in by_length.items():
+            rows.append([
+                search, length, r["count"],
+                f"{r['p50_ms']:.3f}", f"{r['p90_ms']:.3f}",
+                f"{r['p99_ms']:.3f}", f"{r['max_ms']:.3f}",
+            ])
+    print_table(
+        ["search", "degrees", "queries", "p50 ms", "p90 ms", "p99 ms",
+         "max ms"], rows
+    )
+
+
+def benchmark_load(args):
+    print_load(run_load(args.directory))
+
+
+def benchmark_load_once(args):
+    seconds, rss = load_once(args.directory, args.loader)
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": rss}))
+
+
+def benchmark_query(args):
+    print_query(run_query(args.directory, args.queries, args.seed,
+                          args.searches.split(",")))
+
+
+def benchmark_suite(args):
+    results = {}
+    workdir = args.workdir or tempfile.mkdtemp(prefix="degrees-bench-")
+    for edges in [int(e) for e in args.edges.split(",")]:
+        directory = os.path.join(workdir, f"edges-{edges}")
+        people, movies, stars = generate(directory, edges, seed=args.seed)
+        print(f"\n== {edges} edges: {people} people, {movies} movies, "
+              f"{stars} star rows ==")
+        load = run_load(directory)
+        print_load(load)
+        query = run_query(directory, args.queries, args.seed,
+                          args.searches.split(","))
+        print_query(query)
+        results[edges] = {"load": load, "query": query}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def benchmark_parallel(args):
+    from parallel import ParallelSearch
+
+    graph = load_graph(args.directory, snapshot=True)
+    search = ParallelSearch(
+        os.path.join(args.directory, SNAPSHOT_NAME),
+        processes=args.processes,
+        min_parallel_level=args.min_parallel_level
+    )
+    serial_times = defaultdict(list)
+    parallel_times = defaultdict(list)
+    try:
+        for source, target in sample_pairs(graph, args.queries, args.seed):
+            path, serial = timed(graph.search, source, target)
+            parallel_path, parallel = timed(search.search, source, target)
+            length = path_length(path)
+            if length != path_length(parallel_path):
+                raise AssertionError(
+                    f"path lengths differ for {source} -> {target}"
+                )
+            serial_times[length].append(serial)
+            parallel_times[length].append(parallel)
+    finally:
+        search.close()
+
+    rows = []
+    for length in sorted(serial_times, key=lambda d: (d is None, d)):
+        serial = sum(serial_times[length]) / len(serial_times[length])
+        parallel = sum(parallel_times[length]) / len(parallel_times[length])
+        rows.append([
+            "none" if length is None else length,
+            len(serial_times[length]),
+            f"{serial * 1000:.2f}",
+            f"{parallel * 1000:.2f}",
+            f"{serial / parallel:.2f}x",
+        ])
+    print(f"{search.processes} processes, "
+          f"{graph.num_people()} people, {graph.num_edges()} star rows")
+    print_table(
+        ["degrees", "queries", "serial ms", "parallel ms", "speedup"], rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser(
+        "load", help="time and peak RSS of each loader"
+    )
+    load.add_argument("directory")
+    load.set_defaults(run=benchmark_load)
+
+    load_once = commands.add_parser("load-once")
+    load_once.add_argument("directory")
+    load_once.add_argument("loader", choices=LOADERS)
+    load_once.set_defaults(run=benchmark_load_once)
+
+    query = commands.add_parser(
+        "query", help="search latency percentiles by path length"
+    )
+    query.add_argument("directory")
+    query.add_argument("--queries", type=int, default=200)
+    query.add_argument("--searches", default=",".join(SEARCHES))
+    query.add_argument("--seed", type=int, default=0)
+    query.set_defaults(run=benchmark_query)
+
+    suite = commands.add_parser(
+        "suite", help="load and query benchmarks on synthetic graphs"
+    )
+    suite.add_argument("--edges", default="10000,100000,1000000")
+    suite.add_argument("--queries", type=int, default=200)
+    suite.add_argument("--searches", default=",".join(SEARCHES))
+    suite.add_argument("--workdir", help="where to generate datasets")
+    suite.add_argument("--json", help="also write results to this file")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.set_defaults(run=benchmark_suite)
+
+    parallel = commands.add_parser(
+        "parallel", help="serial vs multi-core BFS by path length"
+    )
+    parallel.add_argument("directory")
+    parallel.add_argument("--queries", type=int, default=100)
+    parallel.add_argument("--processes", type=int, default=None)
+    parallel.add_argument("--min-parallel-level", type=int, default=2048)
+    parallel.add_argument("--seed", type=int, default=0)
+    parallel.set_defaults(run=benchmark_parallel)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
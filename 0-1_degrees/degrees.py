@@ -1,7 +1,7 @@
 import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from util import Node, DequeFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -94,34 +94,106 @@ def shortest_path(source, target):
     If no possible path, returns None.
     """
 
-    # TODO
     source_node=Node(source,None,None)
-    queue_person=QueueFrontier()
+    if source==target:
+        return []
+
+    queue_person=DequeFrontier()
     queue_person.add(source_node)
-    print(f"{queue_person.frontier}")
-    explored_ids=set()
-    result=[]
+    # People already queued or explored, so each is generated only once
+    seen_ids={source}
 
-    while True:
-        if queue_person.empty() :
-            return None
+    while not queue_person.empty():
         current_node=queue_person.remove()
-        explored_ids.add(current_node.state)
-
-        if current_node.state==target:
-            print(f"Path found")
-            while(current_node.parent is not None):
-                result.append((current_node.action,current_node.state))
-                current_node=current_node.parent
-            result.reverse()
-            return result
-
-        neighbors=neighbors_for_person(current_node.state)
-        for movie_id, person_id in neighbors:
-            #Verify if they are not in the explored set or queue
-            if person_id not in explored_ids and queue_person.contains_state(person_id) is not True:
-                child=Node(person_id,current_node,movie_id)
-                queue_person.add(child)
+
+        for movie_id, person_id in unseen_neighbors(current_node.state, seen_ids):
+            seen_ids.add(person_id)
+            child=Node(person_id,current_node,movie_id)
+
+            # Goal test on generation: stop before the rest of the level
+            if person_id==target:
+                result=[]
+                while(child.parent is not None):
+                    result.append((child.action,child.state))
+                    child=child.parent
+                result.reverse()
+                return result
+
+            queue_person.add(child)
+
+    return None
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both ends.
+    :param source: IMDB id of the source person
+    :param target: IMDB id for a person's name
+
+    Each step expands one whole BFS level of the smaller side, so the
+    first person reached by both searches lies on a shortest path.
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps person_id to (movie_id, person_id) one step closer to the root
+    parents_source = {source: None}
+    parents_target = {target: None}
+    level_source = [source]
+    level_target = [target]
+
+    while level_source and level_target:
+        # Expand the side with the smaller frontier
+        if len(level_source) <= len(level_target):
+            meeting, level_source = expand_level(
+                level_source, parents_source, parents_target)
+        else:
+            meeting, level_target = expand_level(
+                level_target, parents_target, parents_source)
+
+        if meeting is not None:
+            return join_paths(meeting, parents_source, parents_target)
+
+    return None
+
+
+def expand_level(level, parents, other_parents):
+    """
+    Expands every person of one BFS level, recording parents.
+    Returns (meeting person_id or None, next level).
+    """
+    next_level = []
+    for person_id in level:
+        for movie_id, neighbor_id in unseen_neighbors(person_id, parents):
+            parents[neighbor_id] = (movie_id, person_id)
+            if neighbor_id in other_parents:
+                return neighbor_id, next_level
+            next_level.append(neighbor_id)
+    return None, next_level
+
+
+def join_paths(meeting, parents_source, parents_target):
+    """
+    Builds the (movie_id, person_id) path through the meeting person
+    from the parents recorded by both searches.
+    """
+    path = []
+    person_id = meeting
+    while parents_source[person_id] is not None:
+        movie_id, previous_id = parents_source[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous_id
+    path.reverse()
+
+    person_id = meeting
+    while parents_target[person_id] is not None:
+        movie_id, next_id = parents_target[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
+
 
 def person_id_for_name(name):
     """
@@ -162,5 +234,17 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def unseen_neighbors(person_id, seen):
+    """
+    Yields (movie_id, person_id) pairs for people who starred with a
+    given person and are not in seen, without building the full set.
+    A co-star added to seen by the caller is not yielded again.
+    """
+    for movie_id in people[person_id]["movies"]:
+        for star_id in movies[movie_id]["stars"]:
+            if star_id not in seen:
+                yield movie_id, star_id
+
+
 if __name__ == "__main__":
     main()
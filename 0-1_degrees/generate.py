@@ -0,0 +1,110 @@
+"""
+Generate synthetic actor/movie datasets for benchmarking.
+
+    python generate.py DIRECTORY --edges 1000000 [--seed 0]
+
+writes people.csv, movies.csv and stars.csv in the same format as the
+small and large datasets. Casting follows a power law: the chance that a
+person appears in a movie falls off with their popularity rank, so a few
+hub actors have huge filmographies and most people have one or two
+movies, like the real IMDB graph.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+from bisect import bisect
+
+SYLLABLES = [
+    "al", "an", "ar", "be", "bo", "ca", "da", "de", "el", "em", "fa", "ga",
+    "ha", "is", "ja", "ka", "la", "le", "li", "ma", "mi", "na", "ni", "no",
+    "ol", "pa", "ra", "re", "ri", "ro", "sa", "se", "ta", "to", "va", "za",
+]
+
+
+def make_name(rng):
+    """Returns a random two-part name such as 'Kalema Rosa'."""
+    def part():
+        return "".join(
+            rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))
+        ).capitalize()
+    return f"{part()} {part()}"
+
+
+def generate(directory, edges, people_per_edge=0.4, mean_cast=8,
+             alpha=0.5, seed=0):
+    """
+    Writes a synthetic dataset with about `edges` star rows to directory.
+    :param people_per_edge: people generated per star row
+    :param mean_cast: average number of stars per movie
+    :param alpha: power-law exponent of person popularity
+    """
+    rng = random.Random(seed)
+    num_people = max(2, int(edges * people_per_edge))
+    num_movies = max(1, edges // mean_cast)
+    os.makedirs(directory, exist_ok=True)
+
+    # Person i is picked with weight (i + 1) ** -alpha
+    cumulative = list(itertools.accumulate(
+        (i + 1) ** -alpha for i in range(num_people)
+    ))
+    total = cumulative[-1]
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([i + 1, make_name(rng), rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i + 1, f"Movie {i + 1}", rng.randint(1920, 2024)])
+
+    written = 0
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            remaining = edges - written
+            if remaining <= 0:
+                break
+            cast_size = min(remaining, max(
+                1, int(rng.expovariate(1 / mean_cast)) + 1
+            ))
+            cast = {
+                bisect(cumulative, rng.random() * total)
+                for _ in range(cast_size)
+            }
+            for person in cast:
+                writer.writerow([min(person, num_people - 1) + 1, movie + 1])
+            written += len(cast)
+    return num_people, num_movies, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("directory")
+    parser.add_argument("--edges", type=int, default=100000)
+    parser.add_argument("--people-per-edge", type=float, default=0.4)
+    parser.add_argument("--mean-cast", type=int, default=8)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    people, movies, stars = generate(
+        args.directory, args.edges, args.people_per_edge,
+        args.mean_cast, args.alpha, args.seed
+    )
+    print(f"Wrote {people} people, {movies} movies "
+          f"and {stars} star rows to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,994 @@
+"""
+Compact integer-indexed movie graph for degrees of separation.
+
+People and movies are mapped to dense ints and the star relation is kept
+as two compressed sparse row (CSR) adjacencies in `array` buffers:
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]  movies of p
+    movie_people[movie_offsets[m]:movie_offsets[m + 1]]     stars of m
+
+Each star row costs two 4-byte entries (one per direction). Rows added
+later with Graph.append live in small overlay lists until compact()
+folds them into the CSR arrays.
+
+A loaded graph can be written to a binary snapshot whose arrays are
+memory-mapped on later starts instead of re-parsing the CSV files.
+"""
+
+import csv
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from names import NameIndex
+
+SNAPSHOT_MAGIC = b"DEGSNAP1"
+SNAPSHOT_NAME = "graph.snapshot"
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+ARRAY_FIELDS = ("person_offsets", "person_movies",
+                "movie_offsets", "movie_people")
+
+
+class Graph():
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people):
+        # Per-person and per-movie attributes, indexed by dense int
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+
+        # CSR adjacency in both directions
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Edges appended after the CSR arrays were built
+        self.extra_person_movies = {}
+        self.extra_movie_people = {}
+        self.extra_edges = 0
+
+        # IMDB id -> dense int
+        self.person_index = {
+            person_id: i for i, person_id in enumerate(person_ids)
+        }
+        self.movie_index = {
+            movie_id: i for i, movie_id in enumerate(movie_ids)
+        }
+        # Sorted name index for exact, prefix and fuzzy lookups
+        self.name_index = NameIndex(person_names)
+
+        # Bumped by every append. Threads that search while others
+        # append hold lock.read() to search and lock.write() to append
+        self.version = 0
+        self.lock = ReadWriteLock()
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def num_edges(self):
+        """Returns the number of distinct (person, movie) star rows."""
+        return len(self.person_movies) + self.extra_edges
+
+    def adjacency_nbytes(self):
+        """Returns the number of bytes held by the CSR arrays."""
+        return sum(
+            len(a) * a.itemsize for a in (
+                self.person_offsets, self.person_movies,
+                self.movie_offsets, self.movie_people
+            )
+        )
+
+    def person_ids_for_name(self, name):
+        """
+        Returns the IMDB ids of every person with the given name.
+        """
+        return [self.person_ids[p] for p in self.name_index.exact(name)]
+
+    def candidates_for_name(self, text, limit=10):
+        """
+        Returns up to limit ranked candidates for text as dicts of
+        person_id, name, birth, match kind and distance. Never prompts.
+        """
+        return [
+            {
+                "person_id": self.person_ids[person],
+                "name": self.person_names[person],
+                "birth": self.person_births[person],
+                "match": kind,
+                "distance": distance,
+            }
+            for person, kind, distance
+            in self.name_index.candidates(text, limit)
+        ]
+
+    def movies_of(self, person):
+        """Returns the movie ints a person int starred in."""
+        if person < len(self.person_offsets) - 1:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        else:
+            movies = ()
+        extra = self.extra_person_movies.get(person)
+        if extra:
+            return list(movies) + extra
+        return movies
+
+    def stars_of(self, movie):
+        """Returns the person ints who starred in a movie int."""
+        if movie < len(self.movie_offsets) - 1:
+            stars = self.movie_people[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        else:
+            stars = ()
+        extra = self.extra_movie_people.get(movie)
+        if extra:
+            return list(stars) + extra
+        return stars
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) int pairs for people
+        who starred with a given person.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+        :param source: IMDB id of the source person
+        :param target: IMDB id of the target person
+
+        If no possible path, returns None.
+        """
+        path = self.search(
+            self.person_index[source], self.person_index[target]
+        )
+        if path is None:
+            return None
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+    def search(self, source, target):
+        """
+        Breadth-first search over dense ints.
+        Returns a list of (movie, person) int pairs or None.
+        """
+        if source == target:
+            return []
+
+        # Walk the CSR offset ranges in place, as parallel.expand does, so
+        # no slice is allocated per person or movie. The slicing helpers
+        # are only needed once appended edges live in the overlay.
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        num_csr_people = len(person_offsets) - 1
+        overlay = self.extra_edges > 0
+        movies_of = self.movies_of
+        stars_of = self.stars_of
+
+        # Maps a reached person to (movie, parent person)
+        parents = {source: None}
+        level = [source]
+        while level:
+            next_level = []
+            for person in level:
+                if overlay:
+                    movies = movies_of(person)
+                    start, stop = 0, len(movies)
+                elif person < num_csr_people:
+                    movies = person_movies
+                    start = person_offsets[person]
+                    stop = person_offsets[person + 1]
+                else:
+                    continue
+                for i in range(start, stop):
+                    movie = movies[i]
+                    if overlay:
+                        stars = stars_of(movie)
+                        first, last = 0, len(stars)
+                    else:
+                        stars = movie_people
+                        first = movie_offsets[movie]
+                        last = movie_offsets[movie + 1]
+                    for j in range(first, last):
+                        star = stars[j]
+                        if star in parents:
+                            continue
+                        parents[star] = (movie, person)
+                        if star == target:
+                            return build_path(parents, target)
+                        next_level.append(star)
+            level = next_level
+        return None
+
+    def shortest_path_dag(self, source, target):
+        """
+        Breadth-first search that records every (movie, parent) pair one
+        level closer to source, stopping after the level that reaches
+        target. Returns a PathDAG of all shortest paths, or None.
+        """
+        if source == target:
+            return PathDAG(source, target, {source: []})
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        num_csr_people = len(person_offsets) - 1
+        overlay = self.extra_edges > 0
+        movies_of = self.movies_of
+        stars_of = self.stars_of
+
+        depth = {source: 0}
+        parents = {source: []}
+        level = [source]
+        found = False
+        while level and not found:
+            next_level = []
+            for person in level:
+                child_depth = depth[person] + 1
+                if overlay:
+                    movies = movies_of(person)
+                    start, stop = 0, len(movies)
+                elif person < num_csr_people:
+                    movies = person_movies
+                    start = person_offsets[person]
+                    stop = person_offsets[person + 1]
+                else:
+                    continue
+                for i in range(start, stop):
+                    movie = movies[i]
+                    if overlay:
+                        stars = stars_of(movie)
+                        first, last = 0, len(stars)
+                    else:
+                        stars = movie_people
+                        first = movie_offsets[movie]
+                        last = movie_offsets[movie + 1]
+                    for j in range(first, last):
+                        star = stars[j]
+                        star_depth = depth.get(star)
+                        if star_depth is None:
+                            depth[star] = child_depth
+                            parents[star] = [(movie, person)]
+                            next_level.append(star)
+                            if star == target:
+                                found = True
+                        elif star_depth == child_depth:
+                            parents[star].append((movie, person))
+            level = next_level
+        if not found:
+            return None
+
+        # Keep only people that lie on some shortest path to target
+        dag = {}
+        stack = [target]
+        while stack:
+            person = stack.pop()
+            if person in dag:
+                continue
+            dag[person] = parents[person]
+            stack.extend(parent for _, parent in parents[person])
+        return PathDAG(source, target, dag)
+
+    def all_shortest_paths(self, source, target):
+        """
+        Yields every shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, one at a time.
+        :param source: IMDB id of the source person
+        :param target: IMDB id of the target person
+        """
+        dag = self.shortest_path_dag(
+            self.person_index[source], self.person_index[target]
+        )
+        if dag is None:
+            return
+        for path in dag.paths():
+            yield [
+                (self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path
+            ]
+
+    def search_tree(self, source):
+        """
+        Runs one full BFS from a source person int and returns the
+        SearchTree of parents and distances for every reached person.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        num_csr_people = len(person_offsets) - 1
+        overlay = self.extra_edges > 0
+        movies_of = self.movies_of
+        stars_of = self.stars_of
+
+        n = self.num_people()
+        parent_person = array("i", [-1]) * n
+        parent_movie = array("i", [-1]) * n
+        distance = array("i", [-1]) * n
+        distance[source] = 0
+
+        level = [source]
+        depth = 0
+        while level:
+            depth += 1
+            next_level = []
+            for person in level:
+                if overlay:
+                    movies = movies_of(person)
+                    start, stop = 0, len(movies)
+                elif person < num_csr_people:
+                    movies = person_movies
+                    start = person_offsets[person]
+                    stop = person_offsets[person + 1]
+                else:
+                    continue
+                for i in range(start, stop):
+                    movie = movies[i]
+                    if overlay:
+                        stars = stars_of(movie)
+                        first, last = 0, len(stars)
+                    else:
+                        stars = movie_people
+                        first = movie_offsets[movie]
+                        last = movie_offsets[movie + 1]
+                    for j in range(first, last):
+                        star = stars[j]
+                        if distance[star] != -1:
+                            continue
+                        distance[star] = depth
+                        parent_person[star] = person
+                        parent_movie[star] = movie
+                        next_level.append(star)
+            level = next_level
+        return SearchTree(source, parent_person, parent_movie, distance)
+
+    def append(self, people=(), movies=(), stars=()):
+        """
+        Adds rows shaped like people.csv, movies.csv and stars.csv rows
+        (dicts) to the graph in place, without re-reading any CSV.
+        Known ids, duplicate star rows and star rows naming unknown
+        people or movies are skipped. Ids are compared as strings.
+
+        Every row is checked before the graph is changed, and ValueError
+        is raised if any row lacks a required field.
+
+        Returns the list of new (person, movie) int edges.
+        """
+        people = clean_rows(people, "people", ("id", "name"), ("birth",))
+        movies = clean_rows(movies, "movies", ("id", "title"), ("year",))
+        stars = clean_rows(stars, "stars", ("person_id", "movie_id"), ())
+
+        for row in people:
+            if row["id"] in self.person_index:
+                continue
+            person = len(self.person_ids)
+            self.person_index[row["id"]] = person
+            self.person_ids.append(row["id"])
+            self.person_names.append(row["name"])
+            self.person_births.append(row["birth"])
+            self.name_index.add(row["name"], person)
+
+        for row in movies:
+            if row["id"] in self.movie_index:
+                continue
+            self.movie_index[row["id"]] = len(self.movie_ids)
+            self.movie_ids.append(row["id"])
+            self.movie_titles.append(row["title"])
+            self.movie_years.append(row["year"])
+
+        edges = []
+        for row in stars:
+            person = self.person_index.get(row["person_id"])
+            movie = self.movie_index.get(row["movie_id"])
+            if person is None or movie is None:
+                continue
+            if movie in self.movies_of(person):
+                continue
+            self.extra_person_movies.setdefault(person, []).append(movie)
+            self.extra_movie_people.setdefault(movie, []).append(person)
+            self.extra_edges += 1
+            edges.append((person, movie))
+        self.version += 1
+        return edges
+
+    def compact(self):
+        """
+        Folds appended edges into new CSR arrays.
+        """
+        if not self.extra_edges:
+            return
+        rows, cols = array("i"), array("i")
+        for person in range(self.num_people()):
+            for movie in self.movies_of(person):
+                rows.append(person)
+                cols.append(movie)
+        self.person_offsets, self.person_movies = build_csr(
+            self.num_people(), rows, cols
+        )
+        del rows, cols
+        self.movie_offsets, self.movie_people = transpose_csr(
+            self.num_movies(), self.person_offsets, self.person_movies
+        )
+        self.extra_person_movies = {}
+        self.extra_movie_people = {}
+        self.extra_edges = 0
+
+
+class PathDAG():
+    """
+    Every shortest path from source to target, stored as the
+    (movie, parent person) pairs of each person on those paths.
+    """
+    def __init__(self, source, target, parents):
+        self.source = source
+        self.target = target
+        self.parents = parents
+
+    def count(self):
+        """Returns the number of shortest paths without listing them."""
+        counts = {self.source: 1}
+
+        def count_to(person):
+            if person not in counts:
+                counts[person] = sum(
+                    count_to(parent) for _, parent in self.parents[person]
+                )
+            return counts[person]
+
+        return count_to(self.target)
+
+    def paths(self):
+        """
+        Yields each shortest path as a list of (movie, person) int pairs,
+        generating them lazily so huge counts are never held at once.
+        """
+        def paths_to(person):
+            if person == self.source:
+                yield []
+                return
+            for movie, parent in self.parents[person]:
+                for path in paths_to(parent):
+                    path.append((movie, person))
+                    yield path
+
+        for path in paths_to(self.target):
+            yield path
+
+
+class SearchTree():
+    """
+    Parent and distance arrays of a single-source BFS, indexed by person
+    int. Unreached people, and people appended after the search, have
+    distance -1.
+    """
+    def __init__(self, source, parent_person, parent_movie, distance):
+        self.source = source
+        self.parent_person = parent_person
+        self.parent_movie = parent_movie
+        self.distance = distance
+
+    def nbytes(self):
+        return sum(len(a) * a.itemsize for a in (
+            self.parent_person, self.parent_movie, self.distance
+        ))
+
+    def get_distance(self, person):
+        """Returns the stored distance of a person int, -1 if unreached."""
+        if person >= len(self.distance):
+            return -1
+        return self.distance[person]
+
+    def distance_to(self, target):
+        """Returns the degrees from source to target, or None."""
+        distance = self.get_distance(target)
+        return None if distance == -1 else distance
+
+    def path_to(self, target):
+        """
+        Returns the (movie, person) int pairs from source to target by
+        walking parents, or None if target was not reached.
+        """
+        if self.get_distance(target) == -1:
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            path.append((self.parent_movie[person], person))
+            person = self.parent_person[person]
+        path.reverse()
+        return path
+
+
+class TreeCache():
+    """
+    LRU cache of SearchTrees keyed by source person int, holding at most
+    max_bytes of tree arrays. Safe to share between threads.
+    """
+    def __init__(self, graph, max_bytes):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, source):
+        """
+        Returns the SearchTree for source, running the BFS on a miss.
+        """
+        with self.lock:
+            tree = self.trees.get(source)
+            if tree is not None:
+                self.trees.move_to_end(source)
+                return tree
+            version = self.graph.version
+
+        # Search outside the lock so other sources are not held up
+        tree = self.graph.search_tree(source)
+        with self.lock:
+            if source in self.trees:
+                self.trees.move_to_end(source)
+                return self.trees[source]
+            # A tree searched before an append may have missed its
+            # invalidate(), so only trees of the current graph are kept
+            if self.graph.version != version:
+                return tree
+            if tree.nbytes() <= self.max_bytes:
+                self.trees[source] = tree
+                self.nbytes += tree.nbytes()
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self.trees.popitem(last=False)
+                    self.nbytes -= evicted.nbytes()
+        return tree
+
+    def path(self, source, target):
+        """
+        Returns the (movie, person) int pairs from source to target,
+        or None if they are not connected.
+        """
+        return self.get(source).path_to(target)
+
+    def invalidate(self, edges):
+        """
+        Drops every cached tree whose distances the new (person, movie)
+        edges can change, and returns how many were dropped.
+
+        Joining person p to movie m links p to every star q of m. A tree
+        stays exact as long as every such new link joins people whose
+        distances differ by at most one, counting unreached as infinite.
+        """
+        links = [(person, self.graph.stars_of(movie))
+                 for person, movie in edges]
+        with self.lock:
+            stale = [
+                source for source, tree in self.trees.items()
+                if tree_affected(tree, links)
+            ]
+            for source in stale:
+                self.nbytes -= self.trees.pop(source).nbytes()
+        return len(stale)
+
+    def append(self, people=(), movies=(), stars=()):
+        """
+        Appends rows to the graph (see Graph.append) and invalidates
+        only the cached trees the new edges can affect.
+        Returns the list of new (person, movie) int edges.
+        """
+        edges = self.graph.append(people, movies, stars)
+        self.invalidate(edges)
+        return edges
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+            self.nbytes = 0
+
+
+class ReadWriteLock():
+    """
+    Lets any number of readers or a single writer hold the lock. New
+    readers wait while a writer is waiting, so appends are not starved
+    by a steady stream of searches. Not reentrant.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writing = False
+        self.writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self.condition:
+            while self.writing or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def tree_affected(tree, links):
+    """
+    Returns True if any (person, stars) link would shorten or create a
+    path in tree.
+    """
+    for person, stars in links:
+        distance = tree.get_distance(person)
+        for star in stars:
+            other = tree.get_distance(star)
+            if distance == -1 or other == -1:
+                if distance != other:
+                    return True
+            elif abs(distance - other) > 1:
+                return True
+    return False
+
+
+def build_path(parents, target):
+    """
+    Walks parents back from target and returns (movie, person) pairs
+    in source-to-target order.
+    """
+    path = []
+    person = target
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def build_csr(num_rows, rows, cols):
+    """
+    Builds (offsets, values) CSR arrays from parallel row/col int arrays,
+    sorting each row and dropping duplicate entries.
+    """
+    counts = array("i", [0]) * (num_rows + 1)
+    for row in rows:
+        counts[row + 1] += 1
+    for i in range(num_rows):
+        counts[i + 1] += counts[i]
+
+    values = array("i", [0]) * len(rows)
+    cursor = array("i", counts[:-1])
+    for row, col in zip(rows, cols):
+        values[cursor[row]] = col
+        cursor[row] += 1
+
+    # Sort each row and compact away duplicates in place
+    offsets = array("i", [0]) * (num_rows + 1)
+    write = 0
+    for row in range(num_rows):
+        start, end = counts[row], counts[row + 1]
+        previous = -1
+        for col in sorted(values[start:end]):
+            if col != previous:
+                values[write] = col
+                write += 1
+                previous = col
+        offsets[row + 1] = write
+    del values[write:]
+    return offsets, values
+
+
+def transpose_csr(num_cols, offsets, values):
+    """
+    Returns the (offsets, values) CSR arrays of the transposed relation.
+    Rows of the result come out sorted because rows are visited in order.
+    """
+    counts = array("i", [0]) * (num_cols + 1)
+    for col in values:
+        counts[col + 1] += 1
+    for i in range(num_cols):
+        counts[i + 1] += counts[i]
+
+    transposed = array("i", [0]) * len(values)
+    cursor = array("i", counts[:-1])
+    for row in range(len(offsets) - 1):
+        for i in range(offsets[row], offsets[row + 1]):
+            col = values[i]
+            transposed[cursor[col]] = row
+            cursor[col] += 1
+    return counts, transposed
+
+
+def load_graph(directory, snapshot=False):
+    """
+    Load people.csv, movies.csv and stars.csv from directory
+    into a compact Graph.
+    :param snapshot: True to use graph.snapshot in directory, or a path.
+
+    With a snapshot, a cache that still matches the CSV files' mtime and
+    size is memory-mapped; otherwise the CSVs are parsed and the
+    snapshot is (re)written.
+    """
+    if snapshot:
+        path = (os.path.join(directory, SNAPSHOT_NAME)
+                if snapshot is True else snapshot)
+        sources = source_stats(directory)
+        graph = load_snapshot(path, sources)
+        if graph is None:
+            graph = parse_graph(directory)
+            save_snapshot(graph, path, sources)
+        return graph
+    return parse_graph(directory)
+
+
+def parse_graph(directory):
+    """
+    Parse the CSV files in directory into a compact Graph.
+    """
+    person_ids, person_names, person_births = [], [], []
+    person_index = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row["id"] in person_index:
+                continue
+            person_index[row["id"]] = len(person_ids)
+            person_ids.append(row["id"])
+            person_names.append(row["name"])
+            person_births.append(row["birth"])
+
+    movie_ids, movie_titles, movie_years = [], [], []
+    movie_index = {}
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row["id"] in movie_index:
+                continue
+            movie_index[row["id"]] = len(movie_ids)
+            movie_ids.append(row["id"])
+            movie_titles.append(row["title"])
+            movie_years.append(row["year"])
+
+    # Star rows referring to unknown people or movies are skipped,
+    # like load_data does
+    rows, cols = array("i"), array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            person = person_index.get(row["person_id"])
+            movie = movie_index.get(row["movie_id"])
+            if person is None or movie is None:
+                continue
+            rows.append(person)
+            cols.append(movie)
+
+    person_offsets, person_movies = build_csr(len(person_ids), rows, cols)
+    del rows, cols
+    movie_offsets, movie_people = transpose_csr(
+        len(movie_ids), person_offsets, person_movies
+    )
+
+    return Graph(person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people)
+
+
+def clean_rows(rows, kind, required, optional):
+    """
+    Returns rows as new dicts holding the required and optional fields
+    as strings, with missing optional fields empty. Raises ValueError if
+    a row is not an object or lacks a required field.
+    """
+    cleaned = []
+    for number, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"{kind} row {number} must be an object")
+        values = {}
+        for field in required + optional:
+            value = row.get(field)
+            if value is None or isinstance(value, bool):
+                if field in required:
+                    raise ValueError(
+                        f"{kind} row {number} needs a {field}"
+                    )
+                value = ""
+            elif not isinstance(value, (str, int)):
+                raise ValueError(
+                    f"{kind} row {number} has an invalid {field}"
+                )
+            values[field] = str(value)
+        cleaned.append(values)
+    return cleaned
+
+
+def read_delta(directory):
+    """
+    Reads whichever of people.csv, movies.csv and stars.csv exist in a
+    delta directory. Returns (people, movies, stars) lists of row dicts
+    ready for Graph.append.
+    """
+    rows = []
+    for name in SOURCE_FILES:
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            rows.append([])
+            continue
+        with open(path, encoding="utf-8") as f:
+            rows.append(list(csv.DictReader(f)))
+    return tuple(rows)
+
+
+def source_stats(directory):
+    """
+    Returns {file name: [mtime_ns, size]} for the dataset CSV files.
+    """
+    stats = {}
+    for name in SOURCE_FILES:
+        st = os.stat(os.path.join(directory, name))
+        stats[name] = [st.st_mtime_ns, st.st_size]
+    return stats
+
+
+def save_snapshot(graph, path, sources):
+    """
+    Writes graph to a binary snapshot at path.
+
+    Layout: magic, header length, JSON header, then each CSR array as raw
+    native ints aligned to 8 bytes, then a pickled name/title index whose
+    CRC-32 is stored in the header.
+    Appended edges are compacted into the CSR arrays first.
+    """
+    graph.compact()
+    index = pickle.dumps((
+        graph.person_ids, graph.person_names, graph.person_births,
+        graph.movie_ids, graph.movie_titles, graph.movie_years
+    ), protocol=pickle.HIGHEST_PROTOCOL)
+
+    header = {
+        "byteorder": sys.byteorder,
+        "itemsize": array("i").itemsize,
+        "sources": sources,
+        "arrays": {},
+    }
+    # Offsets are relative to the end of the header block
+    position = 0
+    for field in ARRAY_FIELDS:
+        values = getattr(graph, field)
+        header["arrays"][field] = [position, len(values)]
+        position = align(position + len(values) * values.itemsize)
+    header["index"] = [position, len(index)]
+    header["index_crc"] = zlib.crc32(index)
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix = align(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(bytes(prefix - f.tell()))
+        for field in ARRAY_FIELDS:
+            values = getattr(graph, field)
+            f.write(bytes(values))
+            f.write(bytes(prefix + align(f.tell() - prefix)
+                          - f.tell()))
+        f.write(index)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path, sources=None):
+    """
+    Memory-maps a snapshot written by save_snapshot.
+    Returns None if it is missing, unreadable, truncated, has a corrupt
+    header or index, or was built from CSV files whose stats differ
+    from sources. The array contents are not checksummed, so that
+    loading stays lazy.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+
+    try:
+        graph = read_snapshot(mapped, sources)
+    except (struct.error, ValueError, KeyError, TypeError, IndexError,
+            OverflowError, EOFError, pickle.UnpicklingError):
+        # A truncated or corrupt snapshot is treated like a missing one
+        graph = None
+    if graph is None:
+        mapped.close()
+        return None
+    # Keep the mapping alive for as long as the graph uses its arrays
+    graph.snapshot = mapped
+    return graph
+
+
+def read_snapshot(mapped, sources):
+    """
+    Returns the Graph stored in a mapped snapshot, or None if it is not
+    a usable snapshot for sources. Raises struct.error, ValueError and
+    the like if the file is truncated or corrupt.
+    """
+    if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        return None
+    start = len(SNAPSHOT_MAGIC)
+    header_length, = struct.unpack("<Q", mapped[start:start + 8])
+    if start + 8 + header_length > len(mapped):
+        raise ValueError("snapshot header is truncated")
+    header = json.loads(mapped[start + 8:start + 8 + header_length])
+    if (header["byteorder"] != sys.byteorder
+            or header["itemsize"] != array("i").itemsize
+            or (sources is not None and header["sources"] != sources)):
+        return None
+    prefix = align(start + 8 + header_length)
+
+    def section(position, length):
+        begin = prefix + position
+        end = begin + length
+        if position < 0 or length < 0 or end > len(mapped):
+            raise ValueError("snapshot section is truncated")
+        return begin, end
+
+    view = memoryview(mapped)
+    arrays = {}
+    for field in ARRAY_FIELDS:
+        position, length = header["arrays"][field]
+        begin, end = section(position, length * header["itemsize"])
+        arrays[field] = view[begin:end].cast("i")
+    begin, end = section(*header["index"])
+    # Unpickling damaged bytes can fail in arbitrary ways, so check first
+    if zlib.crc32(view[begin:end]) != header["index_crc"]:
+        raise ValueError("snapshot index is corrupt")
+    (person_ids, person_names, person_births,
+     movie_ids, movie_titles, movie_years) = pickle.loads(view[begin:end])
+    if (len(arrays["person_offsets"]) != len(person_ids) + 1
+            or len(arrays["movie_offsets"]) != len(movie_ids) + 1):
+        raise ValueError("snapshot arrays do not match its index")
+
+    return Graph(person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 arrays["person_offsets"], arrays["person_movies"],
+                 arrays["movie_offsets"], arrays["movie_people"])
+
+
+def align(position, boundary=8):
+    """Rounds position up to a multiple of boundary."""
+    return (position + boundary - 1) // boundary * boundary
@@ -0,0 +1,303 @@
+"""
+Name index for looking people up without prompting.
+
+Lowercased names are kept in one sorted list, so prefix lookups are a
+bisect followed by a short scan. Fuzzy lookups use a delete index (as in
+SymSpell): every distinct name gets an int id, filed under each variant
+of its first `prefix_length` characters reachable by deleting up to
+`index_distance` of them, keyed together with the name's length. A
+query deletes up to `max_distance` characters of its own prefix and only
+verifies names of a close enough length that share such a variant.
+Closer variants are tried first and at most `max_checks` names are
+verified per query.
+
+The index is one sorted array of packed (variant hash, id) entries,
+under 30 MB for 400k names. Deleting a single character per name keeps
+it that small, at the cost of missing names two substitutions or
+deletions away from the query within the prefix. Building it takes
+several seconds, so long-running callers should call build_deletes()
+up front. A fuzzy lookup then costs 1-4 ms, against microseconds for
+exact and prefix lookups.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Low bits of a delete index entry hold the name id, high bits the hash
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+class NameIndex():
+    def __init__(self, names, max_distance=2, prefix_length=7,
+                 max_checks=128, index_distance=1):
+        """
+        :param names: name of each person, indexed by person int
+        """
+        lowered = [name.lower() for name in names]
+        order = sorted(range(len(lowered)), key=lowered.__getitem__)
+        # Parallel sorted lists: lowercased name and the person it names
+        self.keys = [lowered[i] for i in order]
+        self.people = order
+
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.max_checks = max_checks
+        self.index_distance = index_distance
+        # Built by build_deletes, or else on the first fuzzy lookup:
+        # sorted delete_key(length, variant) << ID_BITS | name id
+        self.deletes = None
+        # Distinct name of each id
+        self.names = []
+        # delete_key -> ids of names added after the build
+        self.added_deletes = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, person):
+        """Adds one person int under name, keeping the index sorted."""
+        key = name.lower()
+        with self.lock:
+            position = bisect_right(self.keys, key)
+            is_new = position == 0 or self.keys[position - 1] != key
+            self.keys.insert(position, key)
+            self.people.insert(position, person)
+            if self.deletes is not None and is_new:
+                name_id = len(self.names)
+                self.names.append(key)
+                for entry in self.delete_entries(key, name_id):
+                    self.added_deletes.setdefault(
+                        entry >> ID_BITS, []
+                    ).append(name_id)
+
+    def exact(self, name):
+        """Returns every person int whose name equals name."""
+        key = name.lower()
+        people = []
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            people.append(self.people[i])
+            i += 1
+        return people
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to limit person ints whose name starts with text,
+        in name order.
+        """
+        return [self.people[i] for i in self.prefix_positions(text, limit)]
+
+    def prefix_positions(self, text, limit):
+        """Returns up to limit positions in keys starting with text."""
+        key = text.lower()
+        positions = []
+        i = bisect_left(self.keys, key)
+        while (i < len(self.keys) and len(positions) < limit
+               and self.keys[i].startswith(key)):
+            positions.append(i)
+            i += 1
+        return positions
+
+    def fuzzy(self, text, max_distance=None, limit=10):
+        """
+        Returns up to limit (distance, person int) pairs for names within
+        max_distance edits of text, closest first.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        if self.deletes is None:
+            self.build_deletes()
+
+        key = text.lower()
+        lengths = [
+            len(key) + offset
+            for offset in sorted(range(-max_distance, max_distance + 1),
+                                 key=abs)
+            if len(key) + offset > 0
+        ]
+        names = self.names
+        checked = set()
+        matches = []
+        for variant in ordered_variants(key[:self.prefix_length],
+                                        max_distance):
+            for length in lengths:
+                for name_id in self.ids_under(length, variant):
+                    if name_id in checked:
+                        continue
+                    if len(checked) == self.max_checks:
+                        break
+                    checked.add(name_id)
+                    name = names[name_id]
+                    distance = edit_distance(key, name, max_distance)
+                    if distance is not None:
+                        matches.append((distance, name))
+        matches.sort()
+
+        results = []
+        for distance, name in matches:
+            # Every person sharing the name sits from its first position
+            position = bisect_left(self.keys, name)
+            while (position < len(self.keys)
+                   and self.keys[position] == name):
+                if len(results) == limit:
+                    return results
+                results.append((distance, self.people[position]))
+                position += 1
+        return results
+
+    def candidates(self, text, limit=10):
+        """
+        Returns up to limit ranked (person int, kind, distance) tuples
+        for text: exact matches, then prefix matches, then fuzzy ones.
+        """
+        results = []
+        seen = set()
+
+        def add(person, kind, distance):
+            if person not in seen and len(results) < limit:
+                seen.add(person)
+                results.append((person, kind, distance))
+
+        for person in self.exact(text):
+            add(person, "exact", 0)
+        # Shorter completions rank first; distance counts added letters
+        positions = sorted(self.prefix_positions(text, limit),
+                           key=lambda i: len(self.keys[i]))
+        for i in positions:
+            add(self.people[i], "prefix", len(self.keys[i]) - len(text))
+        if len(results) == limit:
+            return results
+        for distance, person in self.fuzzy(text, limit=limit):
+            add(person, "fuzzy", distance)
+        return results
+
+    def ids_under(self, length, variant):
+        """
+        Yields the ids of names of the given length filed under variant,
+        plus any whose delete key merely collides with it.
+        """
+        hashed = delete_key(length, variant)
+        deletes = self.deletes
+        i = bisect_left(deletes, hashed << ID_BITS)
+        while i < len(deletes) and deletes[i] >> ID_BITS == hashed:
+            yield deletes[i] & ID_MASK
+            i += 1
+        yield from self.added_deletes.get(hashed, ())
+
+    def build_deletes(self):
+        """Builds the fuzzy delete index, if it is not built yet."""
+        with self.lock:
+            if self.deletes is not None:
+                return
+            # Split entries on their top byte so only one small bucket at a
+            # time is sorted as a list of ints
+            buckets = [array("Q") for _ in range(256)]
+            previous = None
+            for key in self.keys:
+                if key == previous:
+                    continue
+                previous = key
+                name_id = len(self.names)
+                self.names.append(key)
+                for entry in self.delete_entries(key, name_id):
+                    buckets[entry >> 56].append(entry)
+            deletes = array("Q")
+            for i, bucket in enumerate(buckets):
+                deletes.extend(sorted(bucket))
+                buckets[i] = None
+            self.deletes = deletes
+
+    def delete_entries(self, key, name_id):
+        """Returns the delete index entries of one distinct name."""
+        return [
+            delete_key(len(key), variant) << ID_BITS | name_id
+            for variant in delete_variants(key[:self.prefix_length],
+                                           self.index_distance)
+        ]
+
+
+def delete_key(length, variant):
+    """Returns the 32-bit hash a delete variant is filed under."""
+    return hash((length, variant)) & ((1 << (64 - ID_BITS)) - 1)
+
+
+def delete_variants(word, max_distance):
+    """
+    Returns the set of strings reachable from word by deleting up to
+    max_distance characters, including word itself.
+    """
+    variants = {word}
+    level = {word}
+    for _ in range(max_distance):
+        level = {
+            variant[:i] + variant[i + 1:]
+            for variant in level for i in range(len(variant))
+        }
+        variants |= level
+    return variants
+
+
+def ordered_variants(word, max_distance):
+    """
+    Yields the delete variants of word, fewest deletions first.
+    """
+    seen = {word}
+    level = [word]
+    yield word
+    for _ in range(max_distance):
+        next_level = []
+        for variant in level:
+            for i in range(len(variant)):
+                shorter = variant[:i] + variant[i + 1:]
+                if shorter not in seen:
+                    seen.add(shorter)
+                    next_level.append(shorter)
+                    yield shorter
+        level = next_level
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Returns the Levenshtein distance between a and b,
+    or None if it exceeds max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if a == b:
+        return 0
+    # Only the parts between a common prefix and suffix can differ
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return len(a) + len(b)
+
+    # Bit-parallel Levenshtein (Myers, Hyyro): bit i of the vertical
+    # deltas pv/mv is +1/-1 between rows i and i + 1 of the DP column
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | 1 << i
+    pv, mv = full, 0
+    distance = len(a)
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = (ph << 1 | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return distance if distance <= max_distance else None
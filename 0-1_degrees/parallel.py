@@ -0,0 +1,159 @@
+"""
+Multi-core level-synchronous BFS for degrees of separation.
+
+Worker processes memory-map the same graph snapshot, so the read-only
+CSR arrays are shared through the page cache rather than copied. The
+parent process owns the search: for every BFS level it splits the
+frontier into chunks, each worker expands its chunk against a shared
+visited bitmap, and the parent merges the discovered people, records
+their parents and marks them visited before the next level starts.
+
+Small levels are expanded in the parent, where the cost of shipping
+work to the pool would outweigh the gain.
+
+No speedup over Graph.search has been measured yet. On a single core
+with 4 processes it ran at 0.15-0.83x, and it has not been benchmarked
+on 8 or more cores. Two costs bound it whatever the core count: the
+parent merges every chunk's results serially in Python, and the target
+is only tested after a whole level is merged, so the level that reaches
+it is always expanded in full. Measure with `python benchmark.py
+parallel` before relying on it.
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from graph import build_path, load_snapshot
+
+# Worker globals, set by init_worker
+_graph = None
+_visited = None
+_visited_memory = None
+
+
+def init_worker(snapshot_path, visited_name):
+    global _graph, _visited, _visited_memory
+    _graph = load_snapshot(snapshot_path)
+    _visited_memory = shared_memory.SharedMemory(name=visited_name)
+    _visited = _visited_memory.buf
+
+
+def expand_chunk(chunk):
+    """
+    Expands one chunk of a BFS level in a worker.
+    Returns (stars, movies, parents) array bytes for every person not yet
+    visited, each reported once per chunk.
+    """
+    level = array("i")
+    level.frombytes(chunk)
+    stars, movies, parents = expand(_graph, _visited, level)
+    return stars.tobytes(), movies.tobytes(), parents.tobytes()
+
+
+def expand(graph, visited, level):
+    """
+    Returns (stars, movies, parents) arrays of the unvisited people
+    reachable in one step from level.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    seen = set()
+    stars, movies, parents = array("i"), array("i"), array("i")
+    for person in level:
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_people[j]
+                if visited[star] or star in seen:
+                    continue
+                seen.add(star)
+                stars.append(star)
+                movies.append(movie)
+                parents.append(person)
+    return stars, movies, parents
+
+
+class ParallelSearch():
+    """
+    Level-synchronous BFS over a graph snapshot using a process pool.
+    One instance runs one search at a time.
+    """
+    def __init__(self, snapshot_path, processes=None, min_parallel_level=2048):
+        self.graph = load_snapshot(snapshot_path)
+        if self.graph is None:
+            raise ValueError(f"no usable snapshot at {snapshot_path}")
+        self.processes = processes or os.cpu_count()
+        # Levels smaller than this are expanded in the parent process
+        self.min_parallel_level = min_parallel_level
+
+        self.visited_memory = shared_memory.SharedMemory(
+            create=True, size=max(1, self.graph.num_people())
+        )
+        self.visited = self.visited_memory.buf
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=init_worker,
+            initargs=(snapshot_path, self.visited_memory.name)
+        )
+
+    def search(self, source, target):
+        """
+        Breadth-first search over dense ints.
+        Returns a list of (movie, person) int pairs or None.
+        """
+        if source == target:
+            return []
+
+        visited = self.visited
+        visited[:] = bytes(len(visited))
+        visited[source] = 1
+        parents = {source: None}
+
+        level = array("i", [source])
+        while level:
+            if len(level) < self.min_parallel_level:
+                results = [expand(self.graph, visited, level)]
+            else:
+                results = self.expand_parallel(level)
+
+            # Merge, keeping the first parent reported for each person
+            next_level = array("i")
+            for stars, movies, people in results:
+                for star, movie, person in zip(stars, movies, people):
+                    if visited[star]:
+                        continue
+                    visited[star] = 1
+                    parents[star] = (movie, person)
+                    next_level.append(star)
+            if visited[target]:
+                return build_path(parents, target)
+            level = next_level
+        return None
+
+    def expand_parallel(self, level):
+        """
+        Splits level into one chunk per process and expands them on the
+        pool, returning (stars, movies, parents) arrays per chunk.
+        """
+        size = -(-len(level) // self.processes)
+        chunks = [
+            level[i:i + size].tobytes() for i in range(0, len(level), size)
+        ]
+        results = []
+        for stars, movies, people in self.executor.map(expand_chunk, chunks):
+            arrays = (array("i"), array("i"), array("i"))
+            for values, data in zip(arrays, (stars, movies, people)):
+                values.frombytes(data)
+            results.append(arrays)
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+        self.visited.release()
+        self.visited_memory.close()
+        self.visited_memory.unlink()
@@ -0,0 +1,310 @@
+"""
+Long-running batch query mode for degrees of separation.
+
+The graph is loaded once, then name pairs are answered as JSON lines:
+
+    {"source": "Kevin Bacon", "target": "Tom Hanks"}
+    {"source": "Kevin Bacon", "target": "Tom Hanks", "all": true, "limit": 5}
+    {"lookup": "Kevin Ba"}
+    {"append": {"people": [...], "movies": [...], "stars": [...]}}
+
+Requests are read from stdin, from a file, or from a local TCP socket
+(one JSON object per line per connection), and are served by a shared
+thread pool. Answers keep the order of the requests they reply to.
+
+Appends are barriers: every earlier request of the stream is answered
+first and later ones wait for the append. Searches hold the graph's
+read lock and appends its write lock, so an append on one connection
+never changes the graph under a search running for another.
+"""
+
+import argparse
+import itertools
+import json
+import socketserver
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from graph import TreeCache, load_graph
+
+
+def request_limit(request, default=10):
+    """
+    Returns request["limit"] as an int, raising ValueError unless it is
+    a non-negative integer.
+    """
+    limit = request.get("limit", default)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+        raise ValueError("limit must be a non-negative integer")
+    return limit
+
+
+class QueryServer():
+    def __init__(self, graph, workers=8, tree_cache=None):
+        self.graph = graph
+        # Build the fuzzy name index now rather than on the first unknown
+        # name, which would hold the graph's read lock for seconds
+        graph.name_index.build_deletes()
+        # Optional TreeCache answering repeated sources from one BFS
+        self.tree_cache = tree_cache
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # Requests allowed in flight per stream before waiting on answers
+        self.window = workers * 4
+
+    def resolve(self, request, key):
+        """
+        Returns (person int, error) for the person named by request[key]
+        or identified by request[key + "_id"]. error is None or a dict
+        to merge into the answer, listing ranked candidates for names
+        that are unknown or ambiguous.
+        """
+        graph = self.graph
+        person_id = request.get(f"{key}_id")
+        if person_id is not None:
+            person = graph.person_index.get(str(person_id))
+            if person is None:
+                return None, {"error": f"unknown {key}_id {person_id}"}
+            return person, None
+
+        name = request.get(key)
+        if not isinstance(name, str):
+            return None, {"error": f"missing {key}"}
+        people = graph.name_index.exact(name)
+        if len(people) == 1:
+            return people[0], None
+        if not people:
+            error = f"{key} not found: {name}"
+        else:
+            error = f"{key} is ambiguous: {name}; use {key}_id"
+        return None, {
+            "error": error,
+            "candidates": graph.candidates_for_name(name),
+        }
+
+    def answer(self, request):
+        """
+        Returns the JSON-ready answer for one parsed request, holding
+        the graph's write lock for appends and its read lock otherwise.
+        """
+        if "append" in request:
+            with self.graph.lock.write():
+                return self.answer_append(request)
+        with self.graph.lock.read():
+            return self.answer_query(request)
+
+    def answer_append(self, request):
+        answer = {}
+        if "id" in request:
+            answer["id"] = request["id"]
+        rows = request["append"]
+        rows = (rows.get("people", ()), rows.get("movies", ()),
+                rows.get("stars", ()))
+        if self.tree_cache is not None:
+            edges = self.tree_cache.append(*rows)
+        else:
+            edges = self.graph.append(*rows)
+        answer["edges"] = len(edges)
+        return answer
+
+    def answer_query(self, request):
+        graph = self.graph
+        answer = {}
+        if "id" in request:
+            answer["id"] = request["id"]
+
+        if "lookup" in request:
+            answer["candidates"] = graph.candidates_for_name(
+                str(request["lookup"]), request_limit(request)
+            )
+            return answer
+
+        source, error = self.resolve(request, "source")
+        if error is None:
+            target, error = self.resolve(request, "target")
+        if error is not None:
+            answer.update(error)
+            return answer
+
+        if request.get("all"):
+            return self.answer_all(answer, source, target,
+                                   request_limit(request))
+
+        if self.tree_cache is not None:
+            path = self.tree_cache.path(source, target)
+        else:
+            path = graph.search(source, target)
+        answer["source"] = graph.person_ids[source]
+        answer["target"] = graph.person_ids[target]
+        if path is None:
+            answer["degrees"] = None
+            answer["path"] = None
+            return answer
+
+        answer["degrees"] = len(path)
+        answer["path"] = self.describe(path)
+        return answer
+
+    def answer_all(self, answer, source, target, limit):
+        """
+        Fills answer with the number of shortest paths and the first
+        limit of them.
+        """
+        dag = self.graph.shortest_path_dag(source, target)
+        answer["source"] = self.graph.person_ids[source]
+        answer["target"] = self.graph.person_ids[target]
+        if dag is None:
+            answer["degrees"] = None
+            answer["count"] = 0
+            answer["paths"] = []
+            return answer
+
+        paths = list(itertools.islice(dag.paths(), max(0, limit)))
+        answer["degrees"] = len(next(dag.paths()))
+        answer["count"] = dag.count()
+        answer["paths"] = [self.describe(path) for path in paths]
+        return answer
+
+    def describe(self, path):
+        """Returns JSON-ready steps for a (movie, person) int path."""
+        graph = self.graph
+        return [
+            {
+                "movie_id": graph.movie_ids[movie],
+                "movie": graph.movie_titles[movie],
+                "person_id": graph.person_ids[person],
+                "person": graph.person_names[person],
+            }
+            for movie, person in path
+        ]
+
+    def parse(self, line):
+        """
+        Returns (request, None) for a JSON object line, or
+        (None, error reply line) if it is not one.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return None, json.dumps({"error": f"bad request: {e}"})
+        return request, None
+
+    def reply(self, request):
+        """Answers one parsed request, returning the JSON reply line."""
+        try:
+            return json.dumps(self.answer(request))
+        except Exception as e:
+            return json.dumps({"id": request.get("id"), "error": str(e)})
+
+    def answer_line(self, line):
+        """
+        Answers one raw JSON line, returning the JSON reply line.
+        """
+        request, error = self.parse(line)
+        if error is not None:
+            return error
+        return self.reply(request)
+
+    def stream(self, lines):
+        """
+        Yields reply lines for an iterable of request lines, in order,
+        while up to `window` requests run concurrently on the pool.
+        An append waits for every earlier request and runs alone.
+        """
+        pending = deque()
+        for line in lines:
+            if not line.strip():
+                continue
+            request, error = self.parse(line)
+            if error is not None:
+                pending.append(error)
+            elif "append" in request:
+                while pending:
+                    yield self.result(pending.popleft())
+                yield self.reply(request)
+                continue
+            else:
+                pending.append(self.executor.submit(self.reply, request))
+            if len(pending) >= self.window:
+                yield self.result(pending.popleft())
+        while pending:
+            yield self.result(pending.popleft())
+
+    @staticmethod
+    def result(pending):
+        """Returns a queued reply line, waiting if it is a future."""
+        return pending if isinstance(pending, str) else pending.result()
+
+    def serve_file(self, infile, outfile):
+        for reply in self.stream(infile):
+            outfile.write(reply + "\n")
+            outfile.flush()
+
+    def serve_tcp(self, host, port):
+        """
+        Serves JSON lines over TCP until interrupted.
+        Every connection is a stream of requests answered in order.
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                lines = (line.decode("utf-8") for line in self.rfile)
+                for reply in server.stream(lines):
+                    self.wfile.write(reply.encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        with socketserver.ThreadingTCPServer((host, port), Handler) as tcp:
+            tcp.daemon_threads = True
+            print(f"Serving on {host}:{tcp.server_address[1]}",
+                  file=sys.stderr)
+            try:
+                tcp.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer degrees of separation queries as JSON lines."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", help="read requests from this file")
+    parser.add_argument("--port", type=int,
+                        help="serve requests on this local TCP port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--tree-cache-mb", type=float, default=0,
+                        help="cache full BFS trees per source in this "
+                             "many megabytes")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = load_graph(args.directory, snapshot=not args.no_snapshot)
+    print("Data loaded.", file=sys.stderr)
+
+    tree_cache = None
+    if args.tree_cache_mb > 0:
+        tree_cache = TreeCache(graph, int(args.tree_cache_mb * 1024 * 1024))
+    server = QueryServer(graph, workers=args.workers, tree_cache=tree_cache)
+    try:
+        if args.port is not None:
+            server.serve_tcp(args.host, args.port)
+        elif args.input is not None:
+            with open(args.input, encoding="utf-8") as f:
+                server.serve_file(f, sys.stdout)
+        else:
+            server.serve_file(sys.stdin, sys.stdout)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
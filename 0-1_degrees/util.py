@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,32 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+# for BFS on large graphs: O(1) add, remove and membership test
+class DequeFrontier():
+    def __init__(self):
+        self.frontier = deque()
+        # Number of queued nodes per state, so duplicates stay consistent
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            if self.states[node.state] == 1:
+                del self.states[node.state]
+            else:
+                self.states[node.state] -= 1
+            return node
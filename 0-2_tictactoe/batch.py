@@ -0,0 +1,165 @@
+"""
+Batch position evaluation for Tic Tac Toe.
+
+    python batch.py [--workers N] [--input FILE] < boards.jsonl
+
+Each input line is a board as JSON, either a list of rows such as
+[["X", null, null], [null, "O", null], [null, null, null]] or an object
+{"board": [...], "k": 3, "id": ...}. Each output line holds the player
+to move, the minimax value (1 X wins, -1 O wins, 0 draw) and the best
+move [i, j] for that board, in input order.
+
+Work is spread over a process pool. Every worker loads the solved
+position table (book.bin) once, so 3 x 3 positions are lookups. Other
+board shapes get the move found by iterative deepening and no value.
+"""
+
+import argparse
+import itertools
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import book
+import tictactoe as ttt
+
+# Solved-position table of this worker process, set by init_worker
+_book = None
+
+
+def init_worker(path):
+    global _book
+    _book = book.load(path)
+    if _book is None:
+        _book = book.build()
+
+
+def validate(board, k=ttt.WIN_LENGTH):
+    """
+    Raises ValueError unless board is a rectangular list of rows of
+    "X", "O" and null with a legal number of each mark, and k is a
+    positive int.
+    """
+    if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+        raise ValueError("k must be a positive integer")
+    if (not isinstance(board, list) or not board
+            or not all(isinstance(row, list) for row in board)
+            or len({len(row) for row in board}) != 1 or not board[0]):
+        raise ValueError("board must be a non-empty list of equal rows")
+    cells = [cell for row in board for cell in row]
+    if any(cell not in (ttt.X, ttt.O, ttt.EMPTY) for cell in cells):
+        raise ValueError('cells must be "X", "O" or null')
+    x_count, o_count = cells.count(ttt.X), cells.count(ttt.O)
+    if x_count - o_count not in (0, 1):
+        raise ValueError("X moves first, so X count must equal O count "
+                         "or exceed it by one")
+
+
+def evaluate(board, k=ttt.WIN_LENGTH, time_budget=ttt.TIME_BUDGET):
+    """
+    Returns {"player", "value", "move"} for one board. value is None
+    for boards that are not solved exactly (anything but 3 x 3, k = 3).
+    """
+    validate(board, k)
+    if ttt.terminal(board, k):
+        return {"player": None, "value": ttt.utility(board, k),
+                "move": None}
+
+    answer = {"player": ttt.player(board)}
+    if len(board) == 3 and len(board[0]) == 3 and k == 3:
+        x, o = bitboard.from_board(board)
+        solved = book.lookup(_book, x, o) if _book is not None else None
+        if solved is None:
+            solved = bitboard.solve(x, o)
+        move, value = solved
+        answer["value"] = value
+        answer["move"] = list(bitboard.action(move))
+    else:
+        answer["value"] = None
+        answer["move"] = list(ttt.iterative_deepening(board, k, time_budget))
+    return answer
+
+
+def evaluate_safe(board):
+    """
+    Returns evaluate(board), or {"error": message} if it fails, so one
+    bad board does not stop a batch.
+    """
+    try:
+        return evaluate(board)
+    except Exception as e:
+        return {"error": str(e) or type(e).__name__}
+
+
+def evaluate_line(line):
+    """
+    Evaluates one JSON input line and returns the JSON output line.
+    Any failure becomes an error line, so one bad line never stops a
+    stream.
+    """
+    request = None
+    try:
+        request = json.loads(line)
+        if isinstance(request, dict):
+            answer = evaluate(request.get("board"),
+                              request.get("k", ttt.WIN_LENGTH))
+            if "id" in request:
+                answer = {"id": request["id"], **answer}
+        else:
+            answer = evaluate(request)
+    except Exception as e:
+        answer = {"error": str(e) or type(e).__name__}
+        if isinstance(request, dict) and "id" in request:
+            answer = {"id": request["id"], **answer}
+    return json.dumps(answer)
+
+
+def evaluate_batch(boards, workers=None, path=book.BOOK_PATH,
+                   chunksize=256):
+    """
+    Yields evaluate() results for an iterable of boards, in order,
+    using a process pool that shares the solved-position table. A board
+    that cannot be evaluated yields {"error": message} instead.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(path,)) as executor:
+        yield from executor.map(evaluate_safe, boards, chunksize=chunksize)
+
+
+def stream(lines, outfile, workers=None, path=book.BOOK_PATH,
+           batch_size=4096, chunksize=256):
+    """
+    Reads JSON lines and writes one result line per input, in order.
+    Input is consumed batch_size lines at a time, so results stream out
+    while memory stays bounded.
+    """
+    lines = (line for line in lines if line.strip())
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(path,)) as executor:
+        while True:
+            batch = list(itertools.islice(lines, batch_size))
+            if not batch:
+                break
+            for reply in executor.map(evaluate_line, batch,
+                                      chunksize=chunksize):
+                outfile.write(reply + "\n")
+            outfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--input", help="read boards from this file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--book", default=book.BOOK_PATH)
+    args = parser.parse_args()
+
+    if args.input is None:
+        stream(sys.stdin, sys.stdout, args.workers, args.book)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            stream(f, sys.stdout, args.workers, args.book)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Bitboard Tic Tac Toe engine.
+
+A position is two 9-bit integers, one for X and one for O, where bit
+3 * i + j is set if that player holds cell (i, j). Win checks are mask
+tests against the 8 winning lines and moves are a single bit OR.
+
+Solved positions are kept in a transposition table keyed by the 18-bit
+encoding x | o << 9, so each position is searched once per process.
+Positions are first mapped to a canonical form under the 8 rotations
+and reflections of the board, so the table holds one entry per
+equivalence class. The table can be saved to and loaded from disk.
+
+alphabeta is a table-free alternative that prunes with alpha-beta
+bounds and orders moves center, corners, edges, with killer moves
+promoted, and counts the nodes it visits.
+"""
+
+from array import array
+
+X = "X"
+O = "O"
+EMPTY = None
+
+
+class InvalidAction(Exception):
+    pass
+
+
+FULL = 0b111111111
+
+# Rows, columns and diagonals as 9-bit masks
+LINES = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+
+def cell(action):
+    """Returns the bit index of an (i, j) action."""
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise InvalidAction("Cell coordinations are out of bound")
+    return 3 * i + j
+
+
+def action(index):
+    """Returns the (i, j) action of a bit index."""
+    return divmod(index, 3)
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board of (x, o) bitboards.
+    """
+    return [
+        [X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+         for j in range(3)]
+        for i in range(3)
+    ]
+
+
+def player(x, o):
+    """
+    Returns player who has the next turn.
+    """
+    return X if bin(x).count("1") == bin(o).count("1") else O
+
+
+def actions(x, o):
+    """
+    Returns the list of empty bit indexes.
+    """
+    free = ~(x | o) & FULL
+    return [i for i in range(9) if free >> i & 1]
+
+
+def result(x, o, index):
+    """
+    Returns the (x, o) bitboards after the current player takes index.
+    """
+    bit = 1 << index
+    if (x | o) & bit:
+        raise InvalidAction("Cell is already occupied.")
+    if player(x, o) == X:
+        return x | bit, o
+    return x, o | bit
+
+
+def wins(bits):
+    """Returns True if bits covers a winning line."""
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def winner(x, o):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    if wins(x):
+        return X
+    if wins(o):
+        return O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return (x | o) == FULL or wins(x) or wins(o)
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    if wins(x):
+        return 1
+    if wins(o):
+        return -1
+    return 0
+
+
+def rotate(i):
+    """Returns where cell i goes under a quarter turn clockwise."""
+    row, col = divmod(i, 3)
+    return 3 * col + (2 - row)
+
+
+def reflect(i):
+    """Returns where cell i goes under a left-right mirror."""
+    row, col = divmod(i, 3)
+    return 3 * row + (2 - col)
+
+
+def build_symmetries():
+    """
+    Returns the 8 symmetries of the board as permutations, where
+    perm[i] is the cell that cell i moves to.
+    """
+    identity = tuple(range(9))
+    symmetries = []
+    for mirrored in (False, True):
+        perm = tuple(reflect(i) for i in identity) if mirrored else identity
+        for _ in range(4):
+            symmetries.append(perm)
+            perm = tuple(rotate(perm[i]) for i in identity)
+    return symmetries
+
+
+SYMMETRIES = build_symmetries()
+
+# INVERSES[s][c] is the cell that symmetry s moves to c
+INVERSES = [
+    tuple(perm.index(c) for c in range(9)) for perm in SYMMETRIES
+]
+
+# TRANSFORMS[s][bits] is the 9-bit mask bits mapped through symmetry s
+TRANSFORMS = [
+    [
+        sum(1 << perm[i] for i in range(9) if bits >> i & 1)
+        for bits in range(512)
+    ]
+    for perm in SYMMETRIES
+]
+
+# Transposition table: canonical key -> (best index in canonical
+# orientation, value)
+table = {}
+
+
+def key(x, o):
+    """Returns the 18-bit encoding of a position."""
+    return x | o << 9
+
+
+def canonical(x, o):
+    """
+    Returns (key, symmetry) of the smallest key among the 8 symmetric
+    images of a position, and the symmetry index that produces it.
+    """
+    best_key = None
+    best_symmetry = 0
+    for symmetry, transform in enumerate(TRANSFORMS):
+        image = transform[x] | transform[o] << 9
+        if best_key is None or image < best_key:
+            best_key, best_symmetry = image, symmetry
+    return best_key, best_symmetry
+
+
+def solve(x, o):
+    """
+    Returns (best index, value) for the player to move by full minimax,
+    with index None on a terminal position. Results are memoized in the
+    transposition table under the canonical key, and the stored move is
+    mapped back to this orientation.
+    """
+    position, symmetry = canonical(x, o)
+    solved = table.get(position)
+    if solved is not None:
+        index, value = solved
+        if index is not None:
+            index = INVERSES[symmetry][index]
+        return index, value
+
+    if terminal(x, o):
+        table[position] = None, utility(x, o)
+        return table[position]
+
+    maximizing = player(x, o) == X
+    best_index = None
+    best_value = None
+    for index in actions(x, o):
+        _, value = solve(*result(x, o, index))
+        if (best_value is None
+                or (value > best_value if maximizing
+                    else value < best_value)):
+            best_index, best_value = index, value
+    table[position] = SYMMETRIES[symmetry][best_index], best_value
+    return best_index, best_value
+
+
+def save_table(path):
+    """
+    Writes the transposition table to path as 32-bit entries of
+    key | (index + 1) << 18 | (value + 1) << 22.
+    """
+    entries = array("I", (
+        position | (0 if index is None else index + 1) << 18
+        | (value + 1) << 22
+        for position, (index, value) in table.items()
+    ))
+    with open(path, "wb") as f:
+        entries.tofile(f)
+
+
+def load_table(path):
+    """
+    Adds the entries saved by save_table at path to the table.
+    """
+    entries = array("I")
+    with open(path, "rb") as f:
+        entries.frombytes(f.read())
+    for entry in entries:
+        index = (entry >> 18 & 0b1111) - 1
+        table[entry & 0x3FFFF] = (
+            None if index == -1 else index, (entry >> 22 & 0b11) - 1
+        )
+
+
+def minimax(board):
+    """
+    Returns the optimal action (i, j) for the current player on a
+    list-of-lists board, searching on bitboards.
+    """
+    index, _ = solve(*from_board(board))
+    return None if index is None else action(index)
+
+
+# Center, then corners, then edges
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+
+class SearchStats():
+    def __init__(self):
+        self.nodes = 0
+        self.cutoffs = 0
+
+
+def exhaustive(x, o, stats=None):
+    """
+    Returns (best index, value) by plain minimax without the table,
+    counting every visited position in stats.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    if terminal(x, o):
+        return None, utility(x, o)
+
+    maximizing = player(x, o) == X
+    best_index = None
+    best_value = None
+    for index in actions(x, o):
+        _, value = exhaustive(*result(x, o, index), stats)
+        if (best_value is None
+                or (value > best_value if maximizing
+                    else value < best_value)):
+            best_index, best_value = index, value
+    return best_index, best_value
+
+
+def alphabeta(x, o, stats=None):
+    """
+    Returns (best index, value) by minimax with alpha-beta pruning.
+    The value equals solve's and the index is an optimal move.
+    """
+    if stats is None:
+        stats = SearchStats()
+    # One killer move per ply: the last move that caused a cutoff there
+    killers = [None] * 10
+    return alphabeta_value(x, o, -2, 2, killers, stats)
+
+
+def ordered_moves(x, o, killer):
+    """Returns the empty cells in MOVE_ORDER, killer move first."""
+    occupied = x | o
+    moves = [i for i in MOVE_ORDER if not occupied >> i & 1]
+    if killer is not None and killer in moves:
+        moves.remove(killer)
+        moves.insert(0, killer)
+    return moves
+
+
+def alphabeta_value(x, o, alpha, beta, killers, stats):
+    stats.nodes += 1
+    if terminal(x, o):
+        return None, utility(x, o)
+
+    ply = bin(x | o).count("1")
+    maximizing = player(x, o) == X
+    best_index = None
+    best_value = -2 if maximizing else 2
+    for index in ordered_moves(x, o, killers[ply]):
+        _, value = alphabeta_value(*result(x, o, index), alpha, beta,
+                                   killers, stats)
+        if maximizing:
+            if value > best_value:
+                best_index, best_value = index, value
+            alpha = max(alpha, value)
+        else:
+            if value < best_value:
+                best_index, best_value = index, value
+            beta = min(beta, value)
+        if alpha >= beta:
+            stats.cutoffs += 1
+            killers[ply] = index
+            break
+    return best_index, best_value
+
+
+def main():
+    """Prints exhaustive vs alpha-beta node counts for the empty board."""
+    full = SearchStats()
+    pruned = SearchStats()
+    _, value = exhaustive(0, 0, full)
+    index, pruned_value = alphabeta(0, 0, pruned)
+    print(f"exhaustive: {full.nodes} nodes, value {value}")
+    print(f"alpha-beta: {pruned.nodes} nodes, {pruned.cutoffs} cutoffs, "
+          f"value {pruned_value}, move {action(index)}")
+    print(f"reduction: {full.nodes / pruned.nodes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Precomputed perfect-play table for Tic Tac Toe.
+
+Every position reachable from the empty board is solved once with
+bitboard.solve and stored in a 3^9 = 19683 byte table indexed by the
+base-3 encoding of the board (0 empty, 1 X, 2 O per cell). Each byte
+holds the best cell in its low 4 bits (15 when the game is over) and
+the minimax value + 1 in the next 2 bits; unreachable positions are
+0xFF. Looking a move up is two list lookups and one byte read.
+
+    python book.py        rebuilds book.bin
+"""
+
+import os
+
+import bitboard
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.bin")
+SIZE = 3 ** 9
+UNREACHABLE = 0xFF
+NO_MOVE = 0b1111
+
+# TERNARY[bits] is the base-3 weight sum of the cells set in bits
+TERNARY = [
+    sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(512)
+]
+
+
+def index(x, o):
+    """Returns the table index of a position."""
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+def build():
+    """
+    Solves every reachable position and returns the table as bytes.
+    """
+    table = bytearray([UNREACHABLE]) * SIZE
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        i = index(x, o)
+        if table[i] != UNREACHABLE:
+            continue
+        move, value = bitboard.solve(x, o)
+        table[i] = (NO_MOVE if move is None else move) | (value + 1) << 4
+        if move is not None:
+            for cell in bitboard.actions(x, o):
+                stack.append(bitboard.result(x, o, cell))
+    return bytes(table)
+
+
+def save(table, path=BOOK_PATH):
+    with open(path, "wb") as f:
+        f.write(table)
+
+
+def load(path=BOOK_PATH):
+    """
+    Returns the table stored at path, or None if it is missing or
+    has the wrong size.
+    """
+    try:
+        with open(path, "rb") as f:
+            table = f.read()
+    except OSError:
+        return None
+    return table if len(table) == SIZE else None
+
+
+def lookup(table, x, o):
+    """
+    Returns (best cell or None, value) for a position, or None if the
+    position cannot be reached in a legal game.
+    """
+    entry = table[index(x, o)]
+    if entry == UNREACHABLE:
+        return None
+    move = entry & 0b1111
+    return (None if move == NO_MOVE else move), (entry >> 4 & 0b11) - 1
+
+
+def main():
+    table = build()
+    save(table)
+    reachable = sum(1 for entry in table if entry != UNREACHABLE)
+    print(f"Wrote {reachable} solved positions to {BOOK_PATH}")
+
+
+if __name__ == "__main__":
+    main()
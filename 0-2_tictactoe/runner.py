@@ -1,6 +1,8 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
@@ -17,14 +19,27 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# Load the solved-position table so AI moves are lookups, not searches
+ttt.load_book()
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The AI searches on a worker thread so the window keeps redrawing.
+# ai_move holds the pending future, ai_cancel stops its search on reset.
+executor = ThreadPoolExecutor(max_workers=1)
+ai_move = None
+ai_cancel = None
+ai_started = 0
+clock = pygame.time.Clock()
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if ai_cancel is not None:
+                ai_cancel.set()
+            executor.shutdown(wait=False)
             sys.exit()
 
     screen.fill(black)
@@ -108,15 +123,16 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move: start a search, then poll it every frame
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_cancel = threading.Event()
+                ai_move = executor.submit(ttt.minimax, board,
+                                          cancel=ai_cancel)
+                ai_started = time.time()
+            elif ai_move.done() and time.time() - ai_started >= 0.5:
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +157,9 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    if ai_move is not None:
+                        ai_cancel.set()
+                        ai_move = None
 
     pygame.display.flip()
+    clock.tick(60)
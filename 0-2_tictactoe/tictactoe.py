@@ -1,25 +1,38 @@
 """
 Tic Tac Toe Player
+
+Boards may be any m x n grid with k in a row to win (3 x 3 with k = 3
+by default). The 3 x 3 game is solved exactly; larger boards use
+iterative-deepening alpha-beta search with a heuristic evaluation and a
+hard time budget per move.
 """
 
 import math
-from copy import deepcopy
+import time
+
+import bitboard
+import book
+from bitboard import X, O, EMPTY, InvalidAction
+
+# Stones in a row needed to win
+WIN_LENGTH = 3
+
+# Seconds the search may spend on one move on boards larger than 3 x 3
+TIME_BUDGET = 1.0
 
-X = "X"
-O = "O"
-EMPTY = None
+# Perfect-play table set by load_book(), None until then
+opening_book = None
 
-class InvalidAction(Exception):
+
+class SearchTimeout(Exception):
     pass
 
 
-def initial_state():
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
@@ -55,47 +68,60 @@ def result(board, action):
     """
     current_player = player(board)
     row, col = action
-            
+
+    if row < 0 or col < 0 or row >= len(board) or col >= len(board[0]):
+        raise InvalidAction("Cell coordinations are out of bound")
+
     if board[row][col] != EMPTY :
         raise InvalidAction("Cell is already occupied.")
-    
-    if row < 0 or col < 0 or row > 2 or col > 2:
-        raise InvalidAction("Cell coordinations are out of bound")
-    
+
     else : 
         # Function should not modify the input board
-        new_board = deepcopy(board)
+        new_board = [list(cells) for cells in board]
         new_board[row][col] = current_player
         return new_board
 
-def winner(board):
+
+_lines = {}
+
+
+def lines(rows, cols, k):
+    """
+    Returns every run of k cells in a row, column or diagonal of a
+    rows x cols board, as tuples of (i, j). Cached per board shape.
+    """
+    shape = (rows, cols, k)
+    if shape not in _lines:
+        runs = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        runs.append(tuple(
+                            (i + di * step, j + dj * step)
+                            for step in range(k)
+                        ))
+        _lines[shape] = runs
+    return _lines[shape]
+
+
+def winner(board, k=WIN_LENGTH):
     """
     Returns the winner of the game, if there is one.
     """
-    winning_cases = [
-        # Rows
-        [board[0][0], board[0][1], board[0][2]],
-        [board[1][0], board[1][1], board[1][2]],
-        [board[2][0], board[2][1], board[2][2]],
-        # Columns
-        [board[0][0], board[1][0], board[2][0]],
-        [board[0][1], board[1][1], board[2][1]],
-        [board[0][2], board[1][2], board[2][2]],
-        # Diagonals
-        [board[0][0], board[1][1], board[2][2]],
-        [board[0][2], board[1][1], board[2][0]]
-    ]
-
-    for case in winning_cases : 
-        if case[0] == case[1] == case[2] and case[0] != EMPTY : 
-            return case[0]
+    for line in lines(len(board), len(board[0]), k):
+        i, j = line[0]
+        first = board[i][j]
+        if first != EMPTY and all(board[i][j] == first for i, j in line):
+            return first
 
-    
-def terminal(board):
+
+def terminal(board, k=WIN_LENGTH):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None : 
+    if winner(board, k) is not None : 
         return True
     for row in range(len(board)):
         for col in range(len(board[row])):
@@ -103,33 +129,66 @@ def terminal(board):
                 return False
     return True
 
-def utility(board):
+def utility(board, k=WIN_LENGTH):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X : 
+    won = winner(board, k)
+    if won == X : 
         return 1
-    elif winner(board) == O :
+    elif won == O :
         return -1
     else : 
         return 0
 
 
-def minimax(board):
+def load_book(path=book.BOOK_PATH):
+    """
+    Loads the precomputed perfect-play table so minimax becomes a
+    constant-time lookup. Builds and saves the table if it is missing.
+    """
+    global opening_book
+    opening_book = book.load(path)
+    if opening_book is None:
+        opening_book = book.build()
+        book.save(opening_book, path)
+
+
+def minimax(board, k=WIN_LENGTH, time_budget=TIME_BUDGET, cancel=None):
     """
     Returns the optimal action for the current player on the board.
+    Boards other than 3 x 3 with k = 3 return the best action found by
+    iterative deepening within time_budget seconds, or as soon as the
+    threading.Event cancel is set.
+    """
+    if terminal(board, k) == True : 
+        return None
+
+    if len(board) != 3 or len(board[0]) != 3 or k != 3:
+        return iterative_deepening(board, k, time_budget, cancel)
+
+    if opening_book is not None:
+        solved = book.lookup(opening_book, *bitboard.from_board(board))
+        if solved is not None:
+            return bitboard.action(solved[0])
+
+    # Search on the bitboard engine; the list board is only an adapter
+    return bitboard.minimax(board)
+
+
+def minimax_alphabeta(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta pruning with move ordering. Pass a
+    bitboard.SearchStats to collect node counts.
     """
     if terminal(board) == True : 
         return None
-    
-    if player(board) == X : 
-        best_action, _ = max_value(board)
-        return best_action
-    
-    if player(board) == O :
-        best_action, _ = min_value(board)
-        return best_action
-            
+
+    index, _ = bitboard.alphabeta(*bitboard.from_board(board), stats)
+    return bitboard.action(index)
+
+
 def max_value(board):
     if terminal(board) :
         return (None, utility(board))
@@ -157,4 +216,126 @@ def min_value(board):
         if new_min < min_found:
             min_found = new_min
             best_action = action
-    return (best_action,min_found)
\ No newline at end of file
+    return (best_action,min_found)
+
+def iterative_deepening(board, k=WIN_LENGTH, time_budget=TIME_BUDGET,
+                        cancel=None):
+    """
+    Returns the best action found for the current player by alpha-beta
+    searches of increasing depth, stopping when time_budget seconds have
+    passed or the threading.Event cancel is set. The move of the deepest
+    finished search is returned, or the best fully searched move of an
+    unfinished one, which always searches the previous best move first.
+    """
+    deadline = time.monotonic() + time_budget
+    work = [list(cells) for cells in board]
+    rows, cols = len(work), len(work[0])
+    runs = lines(rows, cols, k)
+    through = {}
+    for line in runs:
+        for cell in line:
+            through.setdefault(cell, []).append(line)
+    win = 10 ** (k + 1) * (len(runs) + 1)
+
+    moves = sorted(
+        actions(work),
+        key=lambda a: abs(a[0] - (rows - 1) / 2) + abs(a[1] - (cols - 1) / 2)
+    )
+    color = 1 if player(work) == X else -1
+    best = moves[0]
+
+    def check_time():
+        # Checked at every node: a leaf evaluation on a large board
+        # costs far more than reading the clock
+        if (time.monotonic() > deadline
+                or (cancel is not None and cancel.is_set())):
+            raise SearchTimeout
+
+    def wins_at(i, j):
+        mark = work[i][j]
+        return any(all(work[a][b] == mark for a, b in line)
+                   for line in through.get((i, j), ()))
+
+    def negamax(depth, alpha, beta, color, empty, ply):
+        check_time()
+        if empty == 0:
+            return 0
+        if depth == 0:
+            return color * evaluate(work, runs)
+        mark = X if color == 1 else O
+        best_value = -math.inf
+        for i, j in ordered(empty_cells()):
+            work[i][j] = mark
+            if wins_at(i, j):
+                value = win - ply
+            else:
+                value = -negamax(depth - 1, -beta, -alpha, -color,
+                                 empty - 1, ply + 1)
+            work[i][j] = EMPTY
+            if value > best_value:
+                best_value = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_value
+
+    def empty_cells():
+        return [(i, j) for i in range(rows) for j in range(cols)
+                if work[i][j] == EMPTY]
+
+    def ordered(cells):
+        return sorted(cells, key=lambda a: abs(a[0] - (rows - 1) / 2)
+                      + abs(a[1] - (cols - 1) / 2))
+
+    mark = X if color == 1 else O
+    for depth in range(1, len(moves) + 1):
+        iteration_best = None
+        iteration_value = -math.inf
+        alpha = -math.inf
+        try:
+            for i, j in moves:
+                work[i][j] = mark
+                try:
+                    if wins_at(i, j):
+                        value = win
+                    else:
+                        value = -negamax(depth - 1, -math.inf, -alpha,
+                                         -color, len(moves) - 1, 1)
+                finally:
+                    work[i][j] = EMPTY
+                if value > iteration_value:
+                    iteration_best, iteration_value = (i, j), value
+                alpha = max(alpha, value)
+        except SearchTimeout:
+            if iteration_best is not None:
+                best = iteration_best
+            break
+        best = iteration_best
+        # Search the best move first at the next depth
+        moves.remove(best)
+        moves.insert(0, best)
+        if abs(iteration_value) >= win - len(moves):
+            break
+    return best
+
+
+def evaluate(board, runs):
+    """
+    Returns a heuristic score from X's point of view: every run of k
+    cells holding stones of only one player counts 10 ** stones for
+    that player.
+    """
+    score = 0
+    for line in runs:
+        x_count = o_count = 0
+        for i, j in line:
+            cell = board[i][j]
+            if cell == X:
+                x_count += 1
+            elif cell == O:
+                o_count += 1
+        if x_count and not o_count:
+            score += 10 ** x_count
+        elif o_count and not x_count:
+            score -= 10 ** o_count
+    return score
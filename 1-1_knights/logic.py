@@ -1,19 +1,136 @@
 import itertools
+import weakref
+
+# Above this many symbols, model_check decides entailment with the
+# DPLL backend in sat.py instead of enumerating all 2^n models
+SAT_THRESHOLD = 20
+
+# Above this many symbols (and up to SAT_THRESHOLD), model_check
+# enumerates models in NumPy blocks with vector.py when NumPy is installed
+VECTOR_THRESHOLD = 8
 
 
 class Sentence():
+    """
+    Sentences are hash-consed: building a sentence from the same parts
+    returns the existing node, so equal subsentences are shared. And is
+    the exception, since add() changes it in place, and so is anything
+    built on top of an And. Each node caches its hash and symbol set
+    until the next And.add, which is the only way to change a sentence.
+    """
+    __slots__ = ("_hash", "_symbols", "_epoch", "interned", "__weakref__")
+
+    # Live interned nodes keyed by class and parts; interned parts
+    # compare by identity, so lookups do not walk subtrees
+    nodes = weakref.WeakValueDictionary()
+
+    # Bumped by And.add to invalidate every cached hash and symbol set
+    epoch = 0
+
+    @staticmethod
+    def intern(cls, parts, fields):
+        """
+        Returns the node of cls made of parts, with the attribute values
+        in fields, reusing the interned one if there is one.
+        """
+        interned = all(part.interned for part in parts
+                       if isinstance(part, Sentence))
+        if interned:
+            key = (cls, *parts)
+            node = Sentence.nodes.get(key)
+            if node is not None:
+                return node
+        node = object.__new__(cls)
+        for name, value in fields.items():
+            setattr(node, name, value)
+        node.interned = interned
+        node._epoch = -1
+        if interned:
+            Sentence.nodes[key] = node
+        return node
+
+    @staticmethod
+    def union(sets):
+        """
+        Returns the union of frozensets, reusing the largest one when
+        it already holds all the others, so parents share child sets.
+        """
+        largest = max(sets, key=len, default=frozenset())
+        result = largest.union(*sets)
+        return largest if len(result) == len(largest) else result
+
+    def refresh(self):
+        """Recomputes the cached hash and symbol set if stale."""
+        if self._epoch != Sentence.epoch:
+            self._hash = self.compute_hash()
+            self._symbols = self.compute_symbols()
+            self._epoch = Sentence.epoch
+
+    def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild from the parts so copies and unpickled sentences go
+        # through the intern table; cached hashes are never copied
+        return (type(self), self.__getnewargs__())
+
+    def compute_hash(self):
+        raise Exception("nothing to hash")
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave some
+        symbols unassigned. Returns True, False, or None if the value
+        depends on the unassigned symbols.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the cached frozenset of symbols, which is not copied."""
+        self.refresh()
+        return self._symbols
+
+    def compute_symbols(self):
+        return frozenset()
+
+    def count_symbols(self, counts):
+        """Adds the number of occurrences of each symbol to counts."""
+        pass
+
+    def expression(self, index):
+        """
+        Returns Python source evaluating the sentence over an int `m`
+        whose bit index[name] holds the value of each symbol.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """
+        Returns a function of one int bit vector, where bit i holds the
+        value of symbols[i], that evaluates the sentence without walking
+        the sentence tree.
+        """
+        index = {name: i for i, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda m: bool({self.expression(index)})")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Too deeply nested for the parser: walk the tree instead
+            return lambda m: self.evaluate(
+                {name: bool(m >> i & 1) for name, i in index.items()}
+            )
 
     @classmethod
     def validate(cls, sentence):
@@ -43,14 +160,25 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        # Keyed by type too, since Symbol(1) and Symbol(True) differ
+        return Sentence.intern(cls, (type(name), name), {"name": name})
 
-    def __init__(self, name):
-        self.name = name
+    def __getnewargs__(self):
+        return (self.name,)
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(("symbol", self.name))
 
     def __repr__(self):
@@ -62,22 +190,46 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        return model.get(self.name)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def compute_symbols(self):
+        return frozenset((self.name,))
+
+    def count_symbols(self, counts):
+        counts[self.name] = counts.get(self.name, 0) + 1
+
+    def expression(self, index):
+        try:
+            return f"(m >> {index[self.name]} & 1)"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return Sentence.intern(cls, (operand,), {"operand": operand})
+
+    def __getnewargs__(self):
+        return (self.operand,)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and hash(self) == hash(other)
+            and self.operand == other.operand
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,23 +238,49 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def compute_symbols(self):
+        return self.operand.symbol_set()
+
+    def count_symbols(self, counts):
+        self.operand.count_symbols(counts)
+
+    def expression(self, index):
+        return f"(not {self.operand.expression(index)})"
 
 
 class And(Sentence):
+    # Not interned: add() changes the node in place, and separately
+    # built conjunctions must not see each other's additions
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.interned = False
+        self._epoch = -1
+
+    def __getnewargs__(self):
+        return tuple(self.conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and hash(self) == hash(other)
+            and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -116,30 +294,67 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        # Sentences containing this one may have cached the old value
+        Sentence.epoch += 1
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def compute_symbols(self):
+        return Sentence.union(
+            [conjunct.symbol_set() for conjunct in self.conjuncts]
+        )
+
+    def count_symbols(self, counts):
+        for conjunct in self.conjuncts:
+            conjunct.count_symbols(counts)
+
+    def expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(index) for conjunct in self.conjuncts
+        ) + ")"
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return Sentence.intern(cls, disjuncts, {"disjuncts": disjuncts})
+
+    def __getnewargs__(self):
+        return self.disjuncts
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and hash(self) == hash(other)
+            and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,29 +366,65 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def compute_symbols(self):
+        return Sentence.union(
+            [disjunct.symbol_set() for disjunct in self.disjuncts]
+        )
+
+    def count_symbols(self, counts):
+        for disjunct in self.disjuncts:
+            disjunct.count_symbols(counts)
+
+    def expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(index) for disjunct in self.disjuncts
+        ) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return Sentence.intern(
+            cls, (antecedent, consequent),
+            {"antecedent": antecedent, "consequent": consequent}
+        )
+
+    def __getnewargs__(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication) and hash(self) == hash(other)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,28 +434,60 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def compute_symbols(self):
+        return Sentence.union(
+            [self.antecedent.symbol_set(), self.consequent.symbol_set()]
+        )
+
+    def count_symbols(self, counts):
+        self.antecedent.count_symbols(counts)
+        self.consequent.count_symbols(counts)
+
+    def expression(self, index):
+        return (f"(not {self.antecedent.expression(index)} "
+                f"or {self.consequent.expression(index)})")
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return Sentence.intern(cls, (left, right),
+                               {"left": left, "right": right})
+
+    def __getnewargs__(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional) and hash(self) == hash(other)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
     def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def compute_hash(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -216,48 +499,95 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def compute_symbols(self):
+        return Sentence.union(
+            [self.left.symbol_set(), self.right.symbol_set()]
+        )
 
+    def count_symbols(self, counts):
+        self.left.count_symbols(counts)
+        self.right.count_symbols(counts)
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def expression(self, index):
+        # Operands are 0/1 or bools, which compare equal by truth value
+        return (f"(bool({self.left.expression(index)}) "
+                f"== bool({self.right.expression(index)}))")
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    # Get all symbols in both knowledge and query
+    symbols = set.union(knowledge.symbols(), query.symbols())
+    if len(symbols) > SAT_THRESHOLD:
+        from sat import entails
+        return entails(knowledge, query)
+    if len(symbols) > VECTOR_THRESHOLD:
+        try:
+            from vector import entails
+        except ImportError:
+            pass
         else:
+            return entails(knowledge, query)
+
+    # Assign the most frequent symbols first, so partial models settle
+    # the knowledge base or query as early as possible
+    counts = {}
+    knowledge.count_symbols(counts)
+    query.count_symbols(counts)
+    symbols = sorted(symbols, key=lambda name: (-counts.get(name, 0), name))
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    # Compile both sentences to functions of a bit vector of symbols
+    knowledge_function = knowledge.compile(symbols)
+    query_function = query.compile(symbols)
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    def check_all(position, model, partial):
+        """Checks if knowledge base entails query, given a particular model.
+        Bit i of the int model holds the value of symbols[i], and partial
+        maps the symbols assigned so far to their values."""
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+        # If model has an assignment for each symbol
+        if position == len(symbols):
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+            # If knowledge base is true in model, then query must also be true
+            if knowledge_function(model):
+                return query_function(model)
+            return True
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+        # Stop early once the partial model decides the answer
+        if position:
+            knowledge_value = knowledge.evaluate_partial(partial)
+            if knowledge_value is False:
+                return True
+            query_value = query.evaluate_partial(partial)
+            if query_value is True:
+                return True
+            if knowledge_value is True and query_value is False:
+                return False
+
+        # Ensure entailment holds with the next symbol true and false
+        symbol = symbols[position]
+        partial[symbol] = True
+        entailed = check_all(position + 1, model | 1 << position, partial)
+        if entailed:
+            partial[symbol] = False
+            entailed = check_all(position + 1, model, partial)
+        del partial[symbol]
+        return entailed
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(0, 0, {})
@@ -0,0 +1,247 @@
+"""
+CNF compiler and DPLL satisfiability backend for logic.py.
+
+Sentences are turned into clauses with the Tseitin encoding: every
+compound subsentence gets a fresh variable defined by a few clauses, so
+the CNF grows linearly with the sentence instead of exponentially.
+Literals are non-zero ints, -v being the negation of variable v.
+
+Entailment is decided by refutation: knowledge entails query exactly
+when knowledge AND NOT query is unsatisfiable.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class CNF():
+    def __init__(self):
+        self.clauses = []
+        # Symbol name -> variable, and subsentence -> literal
+        self.variables = {}
+        self.literals = {}
+        self.num_vars = 0
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def encode(self, sentence):
+        """
+        Adds the Tseitin clauses defining sentence and returns the
+        literal that is true exactly when sentence is.
+        """
+        literal = self.literals.get(sentence)
+        if literal is not None:
+            return literal
+
+        if isinstance(sentence, Symbol):
+            literal = self.variables.get(sentence.name)
+            if literal is None:
+                literal = self.variables[sentence.name] = self.new_var()
+        elif isinstance(sentence, Not):
+            literal = -self.encode(sentence.operand)
+        elif isinstance(sentence, And):
+            parts = [self.encode(c) for c in sentence.conjuncts]
+            literal = self.new_var()
+            # literal <=> all parts
+            for part in parts:
+                self.clauses.append([-literal, part])
+            self.clauses.append([literal] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.encode(d) for d in sentence.disjuncts]
+            literal = self.new_var()
+            # literal <=> any part
+            for part in parts:
+                self.clauses.append([literal, -part])
+            self.clauses.append([-literal] + parts)
+        elif isinstance(sentence, Implication):
+            antecedent = self.encode(sentence.antecedent)
+            consequent = self.encode(sentence.consequent)
+            literal = self.new_var()
+            # literal <=> (not antecedent or consequent)
+            self.clauses.append([-literal, -antecedent, consequent])
+            self.clauses.append([literal, antecedent])
+            self.clauses.append([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.new_var()
+            # literal <=> (left <=> right)
+            self.clauses.append([-literal, -left, right])
+            self.clauses.append([-literal, left, -right])
+            self.clauses.append([literal, left, right])
+            self.clauses.append([literal, -left, -right])
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def add(self, sentence):
+        """Asserts that sentence is true."""
+        self.clauses.append([self.encode(sentence)])
+
+
+class Solver():
+    """
+    DPLL with unit propagation over two watched literals per clause,
+    pure literal elimination up front, and chronological backtracking.
+    """
+    def __init__(self, clauses, num_vars):
+        self.num_vars = num_vars
+        # 1 true, -1 false, 0 unassigned, indexed by variable
+        self.assignment = [0] * (num_vars + 1)
+        self.trail = []
+        # Trail length at each decision, and whether it was flipped
+        self.decisions = []
+        self.head = 0
+        self.clauses = []
+        self.units = []
+        self.watches = {}
+        self.conflict = False
+
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            if any(-literal in clause for literal in clause):
+                continue
+            if not clause:
+                self.conflict = True
+            elif len(clause) == 1:
+                self.units.append(clause[0])
+            else:
+                index = len(self.clauses)
+                self.clauses.append(clause)
+                self.watches.setdefault(clause[0], []).append(index)
+                self.watches.setdefault(clause[1], []).append(index)
+
+        # Branch on the variables that occur most often first
+        counts = [0] * (num_vars + 1)
+        for clause in self.clauses:
+            for literal in clause:
+                counts[abs(literal)] += 1
+        self.order = sorted(range(1, num_vars + 1),
+                            key=lambda v: -counts[v])
+        self.next_var = 0
+
+    def value(self, literal):
+        """Returns 1 if literal is true, -1 if false, 0 if unassigned."""
+        v = self.assignment[abs(literal)]
+        return v if literal > 0 else -v
+
+    def assign(self, literal):
+        """Sets literal true, returning False if it is already false."""
+        current = self.value(literal)
+        if current:
+            return current == 1
+        self.assignment[abs(literal)] = 1 if literal > 0 else -1
+        self.trail.append(literal)
+        return True
+
+    def propagate(self):
+        """
+        Runs unit propagation over the trail.
+        Returns False on a conflict.
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(false_literal)
+            if not watchers:
+                continue
+            kept = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    kept.append(index)
+                    continue
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if not self.assign(clause[0]):
+                        kept.extend(watchers[position + 1:])
+                        self.watches[false_literal] = kept
+                        return False
+            self.watches[false_literal] = kept
+        return True
+
+    def pure_literals(self):
+        """Returns literals whose negation occurs in no clause."""
+        seen = set()
+        for clause in self.clauses:
+            seen.update(clause)
+        seen.update(self.units)
+        return [literal for literal in seen if -literal not in seen]
+
+    def backtrack(self):
+        """
+        Undoes the newest unflipped decision and asserts its negation.
+        Returns False when no decision is left to flip.
+        """
+        while self.decisions:
+            length, flipped = self.decisions.pop()
+            decision = self.trail[length]
+            for literal in self.trail[length:]:
+                self.assignment[abs(literal)] = 0
+            del self.trail[length:]
+            self.head = length
+            self.next_var = 0
+            if not flipped:
+                self.decisions.append((length, True))
+                self.assign(-decision)
+                return True
+        return False
+
+    def decide(self):
+        """
+        Assigns the next unassigned variable true as a new decision.
+        Returns False when every variable is assigned.
+        """
+        while self.next_var < len(self.order):
+            variable = self.order[self.next_var]
+            self.next_var += 1
+            if not self.assignment[variable]:
+                self.decisions.append((len(self.trail), False))
+                self.assign(variable)
+                return True
+        return False
+
+    def solve(self):
+        """Returns True if the clauses are satisfiable."""
+        if self.conflict:
+            return False
+        for literal in self.units + self.pure_literals():
+            if not self.assign(literal):
+                return False
+        while True:
+            if not self.propagate():
+                if not self.backtrack():
+                    return False
+            elif not self.decide():
+                return True
+
+    def model(self):
+        """Returns {variable: bool} for the satisfying assignment."""
+        return {v: self.assignment[v] == 1
+                for v in range(1, self.num_vars + 1)}
+
+
+def satisfiable(sentence):
+    """Returns True if some model makes sentence true."""
+    cnf = CNF()
+    cnf.add(sentence)
+    return Solver(cnf.clauses, cnf.num_vars).solve()
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query, by refutation."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not Solver(cnf.clauses, cnf.num_vars).solve()
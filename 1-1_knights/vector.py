@@ -0,0 +1,164 @@
+"""
+Vectorized truth-table backend for logic.py, using NumPy.
+
+Models are enumerated in blocks of 2^BLOCK_BITS at a time. Within a
+block each symbol is a packed bit column, one bit per model in uint64
+words, and a sentence is evaluated over the whole block with bitwise
+ops: And is &, Or is |, Not is ~. Only one block of columns is alive at
+a time, so memory stays bounded however many symbols there are, and the
+search stops at the first block that holds a counter-model.
+
+Within a block only subsentences referenced more than once are cached,
+and each is dropped after its last use, so the live columns are bounded
+by the sharing in the knowledge base. Large knowledge bases use smaller
+blocks to keep one column per node under COLUMN_BUDGET bytes.
+"""
+
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+WORD_BITS = 6
+BLOCK_BITS = 20
+# Bytes of columns a block may need if every node's column were alive
+COLUMN_BUDGET = 1 << 26
+
+# Bit patterns of the first WORD_BITS symbols inside one uint64 word
+WORD_PATTERNS = [
+    np.uint64(sum(1 << m for m in range(64) if m >> i & 1))
+    for i in range(WORD_BITS)
+]
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def columns(count, block_bits):
+    """
+    Returns the packed columns of the first block_bits symbols over one
+    block, for the first count symbols (the rest vary between blocks).
+    """
+    words = 1 << (block_bits - WORD_BITS)
+    word_index = np.arange(words, dtype=np.uint64)
+    result = []
+    for i in range(min(count, block_bits)):
+        if i < WORD_BITS:
+            result.append(np.full(words, WORD_PATTERNS[i], dtype=np.uint64))
+        else:
+            bit = (word_index >> np.uint64(i - WORD_BITS)) & np.uint64(1)
+            result.append(bit * ONES)
+    return result
+
+
+def operands(sentence):
+    """
+    Returns the direct subsentences of sentence.
+    """
+    if isinstance(sentence, Symbol):
+        return ()
+    if isinstance(sentence, Not):
+        return (sentence.operand,)
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return (sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, Biconditional):
+        return (sentence.left, sentence.right)
+    raise TypeError(f"cannot evaluate {sentence!r}")
+
+
+def count_references(sentence, counts):
+    """
+    Adds one reference to sentence in counts, keyed by id, walking each
+    distinct subsentence once.
+    """
+    key = id(sentence)
+    if key in counts:
+        counts[key] += 1
+        return
+    counts[key] = 1
+    for operand in operands(sentence):
+        count_references(operand, counts)
+
+
+def evaluate(sentence, values, cache, counts):
+    """
+    Returns the packed truth values of sentence over one block, where
+    values maps each symbol name to its column and counts holds the
+    uses of each subsentence still to come. Shared subsentences are
+    evaluated once per block and released after their last use.
+    """
+    key = id(sentence)
+    packed = cache.get(key)
+    if packed is not None:
+        counts[key] -= 1
+        if not counts[key]:
+            del cache[key]
+        return packed
+
+    if isinstance(sentence, Symbol):
+        try:
+            return values[sentence.name]
+        except KeyError:
+            raise Exception(f"variable {sentence.name} not in model")
+    elif isinstance(sentence, Not):
+        packed = ~evaluate(sentence.operand, values, cache, counts)
+    elif isinstance(sentence, And):
+        packed = values[None].copy()
+        for conjunct in sentence.conjuncts:
+            packed &= evaluate(conjunct, values, cache, counts)
+    elif isinstance(sentence, Or):
+        packed = ~values[None]
+        for disjunct in sentence.disjuncts:
+            packed |= evaluate(disjunct, values, cache, counts)
+    elif isinstance(sentence, Implication):
+        packed = ~evaluate(sentence.antecedent, values, cache, counts)
+        packed |= evaluate(sentence.consequent, values, cache, counts)
+    elif isinstance(sentence, Biconditional):
+        packed = (evaluate(sentence.left, values, cache, counts)
+                  ^ evaluate(sentence.right, values, cache, counts))
+        np.invert(packed, out=packed)
+    else:
+        raise TypeError(f"cannot evaluate {sentence!r}")
+
+    # Children were combined into a fresh column; keep it only if shared
+    counts[key] -= 1
+    if counts[key]:
+        cache[key] = packed
+    return packed
+
+
+def entails(knowledge, query, block_bits=BLOCK_BITS):
+    """
+    Checks if knowledge base entails query by evaluating both over
+    every model, one block at a time.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    references = {}
+    count_references(knowledge, references)
+    count_references(query, references)
+
+    # Large knowledge bases get smaller blocks, and so smaller columns
+    while (block_bits > WORD_BITS
+           and len(references) << (block_bits - 3) > COLUMN_BUDGET):
+        block_bits -= 1
+    # Blocks are whole words; with fewer symbols models just repeat
+    block_bits = max(WORD_BITS, min(block_bits, len(symbols)))
+    inner = columns(len(symbols), block_bits)
+    words = len(inner[0]) if inner else 1 << (block_bits - WORD_BITS)
+    ones = np.full(words, ONES, dtype=np.uint64)
+    zeros = np.zeros(words, dtype=np.uint64)
+
+    for block in range(1 << max(0, len(symbols) - block_bits)):
+        values = {None: ones}
+        for i, name in enumerate(symbols):
+            if i < block_bits:
+                values[name] = inner[i]
+            else:
+                values[name] = ones if block >> (i - block_bits) & 1 else zeros
+        cache, counts = {}, dict(references)
+        counter_models = (evaluate(knowledge, values, cache, counts)
+                          & ~evaluate(query, values, cache, counts))
+        if counter_models.any():
+            return False
+    return True